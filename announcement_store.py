@@ -0,0 +1,192 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from free_game import FreeGame
+
+logger = logging.getLogger(__name__)
+
+PRUNE_AFTER_SECONDS = 90 * 24 * 3600
+
+class AnnouncementStore:
+    """
+    SQLite record of every game the scheduled check has announced.
+
+    Keyed by (platform, game_id). Membership checks hit an in-memory set, and
+    every change is its own transaction so a crash can't leave a half-written
+    history behind.
+    """
+
+    def __init__(self, path, legacy_json_path=None):
+        self.path = str(path)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS announcements ("
+            " platform TEXT NOT NULL,"
+            " game_id TEXT NOT NULL,"
+            " title TEXT,"
+            " first_seen REAL NOT NULL,"
+            " last_seen REAL NOT NULL,"
+            " expired_at REAL,"
+            " PRIMARY KEY (platform, game_id)"
+            ") WITHOUT ROWID"
+        )
+        # Announcement messages still showing an active deal, so they can be
+        # edited once it ends; `record` is the game as announced (JSON), so the
+        # ended embed can be rendered after a restart
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS posted_messages ("
+            " message_id INTEGER PRIMARY KEY,"
+            " channel_id INTEGER NOT NULL,"
+            " platform TEXT NOT NULL,"
+            " game_id TEXT NOT NULL,"
+            " currency TEXT NOT NULL,"
+            " posted_at REAL NOT NULL,"
+            " record TEXT"
+            ")"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(posted_messages)")}
+        if 'record' not in columns:
+            with self._conn:
+                self._conn.execute("ALTER TABLE posted_messages ADD COLUMN record TEXT")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS posted_messages_game ON posted_messages (platform, game_id)"
+        )
+
+        if legacy_json_path:
+            self._migrate_json(legacy_json_path)
+
+        self._announced = set(self._conn.execute("SELECT platform, game_id FROM announcements"))
+
+    def _migrate_json(self, json_path):
+        """One-shot import of the old announced_games.json, renamed afterwards."""
+        if not os.path.exists(json_path):
+            return
+
+        with open(json_path, 'r') as f:
+            legacy = json.load(f)
+
+        now = time.time()
+        rows = [
+            (platform, str(game_id), now, now)
+            for platform, game_ids in legacy.items()
+            for game_id in game_ids
+        ]
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO announcements (platform, game_id, first_seen, last_seen)"
+                " VALUES (?, ?, ?, ?)",
+                rows
+            )
+        os.replace(json_path, json_path + '.migrated')
+        logger.info("Migrated %d announced game(s) from %s", len(rows), json_path)
+
+    def is_announced(self, platform, game_id):
+        return (platform, str(game_id)) in self._announced
+
+    def mark_announced(self, platform, game_id, title=None):
+        now = time.time()
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO announcements (platform, game_id, title, first_seen, last_seen)"
+                " VALUES (?, ?, ?, ?, ?)"
+                " ON CONFLICT (platform, game_id) DO UPDATE SET"
+                " title = excluded.title, last_seen = excluded.last_seen, expired_at = NULL",
+                (platform, str(game_id), title, now, now)
+            )
+        self._announced.add((platform, str(game_id)))
+
+    def record_snapshot(self, platform, active_ids):
+        """
+        Refresh last_seen for games still on offer and stamp expired_at on
+        announced games that dropped out of the snapshot.
+        """
+        now = time.time()
+        active_ids = [str(game_id) for game_id in active_ids]
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE announcements SET last_seen = ?, expired_at = NULL"
+                " WHERE platform = ? AND game_id = ?",
+                [(now, platform, game_id) for game_id in active_ids]
+            )
+            placeholders = ",".join("?" * len(active_ids))
+            self._conn.execute(
+                "UPDATE announcements SET expired_at = ?"
+                " WHERE platform = ? AND expired_at IS NULL"
+                f" AND game_id NOT IN ({placeholders})",
+                (now, platform, *active_ids)
+            )
+
+    def record_message(self, platform, game_id, channel_id, message_id, currency='USD', game=None):
+        """Remember an announcement message (and the FreeGame it showed) so it can be marked as ended later."""
+        record = json.dumps(game.to_dict()) if game is not None else None
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO posted_messages"
+                " (message_id, channel_id, platform, game_id, currency, posted_at, record)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (message_id, channel_id, platform, str(game_id), currency, time.time(), record)
+            )
+
+    def posted_messages(self, platform, game_id):
+        """(channel_id, message_id, currency) of every live announcement of a game."""
+        return self._conn.execute(
+            "SELECT channel_id, message_id, currency FROM posted_messages"
+            " WHERE platform = ? AND game_id = ?",
+            (platform, str(game_id))
+        ).fetchall()
+
+    def posted_games(self, platform):
+        """
+        {game_id: FreeGame} of every game of `platform` with live announcement
+        messages. Rows from before records were stored get a bare record with
+        the announced title.
+        """
+        games = {}
+        for game_id, record, title in self._conn.execute(
+            "SELECT p.game_id, MAX(p.record), a.title FROM posted_messages p"
+            " LEFT JOIN announcements a ON a.platform = p.platform AND a.game_id = p.game_id"
+            " WHERE p.platform = ? GROUP BY p.game_id",
+            (platform,)
+        ):
+            if record is not None:
+                games[game_id] = FreeGame(**json.loads(record))
+            else:
+                games[game_id] = FreeGame(game_id, platform, title or game_id, '', '')
+        return games
+
+    def forget_messages(self, message_ids):
+        with self._conn:
+            self._conn.executemany(
+                "DELETE FROM posted_messages WHERE message_id = ?",
+                [(message_id,) for message_id in message_ids]
+            )
+
+    def prune(self, older_than=PRUNE_AFTER_SECONDS):
+        """Forget games that expired, and messages posted, more than `older_than` seconds ago."""
+        cutoff = time.time() - older_than
+        with self._conn:
+            self._conn.execute("DELETE FROM posted_messages WHERE posted_at < ?", (cutoff,))
+            pruned = self._conn.execute(
+                "SELECT platform, game_id FROM announcements"
+                " WHERE expired_at IS NOT NULL AND expired_at < ?",
+                (cutoff,)
+            ).fetchall()
+            self._conn.executemany(
+                "DELETE FROM announcements WHERE platform = ? AND game_id = ?",
+                pruned
+            )
+        self._announced.difference_update(pruned)
+        return len(pruned)
+
+    def clear(self):
+        with self._conn:
+            self._conn.execute("DELETE FROM announcements")
+            self._conn.execute("DELETE FROM posted_messages")
+        self._announced.clear()
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,128 @@
+import sqlite3
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_POSITIVE_TTL = 30 * 24 * 3600  # app types practically never change
+DEFAULT_NEGATIVE_TTL = 6 * 3600        # retry "no details" answers a few times a day
+
+class AppTypeCache:
+    """
+    Persistent LRU cache of Steam app types backed by SQLite.
+
+    Entries with a known type live for `positive_ttl` seconds, empty
+    ("Steam had no details") answers for `negative_ttl`. Unexpired rows are
+    loaded into memory on startup, most recently used first.
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES,
+                 positive_ttl=DEFAULT_POSITIVE_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+        self._entries = OrderedDict()  # app_id -> (app_type, expires_at)
+        self._touched = set()
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS app_types ("
+            " app_id TEXT PRIMARY KEY,"
+            " app_type TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._load()
+
+    def _load(self):
+        now = time.time()
+        with self._conn:
+            self._conn.execute("DELETE FROM app_types WHERE expires_at <= ?", (now,))
+            rows = self._conn.execute(
+                "SELECT app_id, app_type, expires_at FROM app_types"
+                " ORDER BY last_used DESC LIMIT ?",
+                (self.max_entries,)
+            ).fetchall()
+            # Anything beyond the size bound is dropped for good
+            self._conn.execute(
+                "DELETE FROM app_types WHERE app_id NOT IN"
+                " (SELECT app_id FROM app_types ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+
+        for app_id, app_type, expires_at in reversed(rows):
+            self._entries[app_id] = (app_type, expires_at)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, app_id):
+        """Return the cached app type ('' for a negative entry) or None on a miss."""
+        entry = self._entries.get(app_id)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        app_type, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[app_id]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(app_id)
+        self._touched.add(app_id)
+        self.hits += 1
+        return app_type
+
+    def set_many(self, app_types):
+        """Store several {app_id: app_type} results in one transaction."""
+        if not app_types and not self._touched:
+            return
+
+        now = time.time()
+        rows = []
+        for app_id, app_type in app_types.items():
+            ttl = self.positive_ttl if app_type else self.negative_ttl
+            self._entries[app_id] = (app_type, now + ttl)
+            self._entries.move_to_end(app_id)
+            self._touched.discard(app_id)
+            rows.append((app_id, app_type, now + ttl, now))
+
+        evicted = []
+        while len(self._entries) > self.max_entries:
+            app_id, _ = self._entries.popitem(last=False)
+            self._touched.discard(app_id)
+            evicted.append((app_id,))
+        self.evictions += len(evicted)
+
+        touched = [(now, app_id) for app_id in self._touched]
+        self._touched.clear()
+
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO app_types (app_id, app_type, expires_at, last_used)"
+                " VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._conn.executemany("UPDATE app_types SET last_used = ? WHERE app_id = ?", touched)
+            self._conn.executemany("DELETE FROM app_types WHERE app_id = ?", evicted)
+
+    def stats(self):
+        """Counters for monitoring."""
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'expirations': self.expirations,
+            'evictions': self.evictions,
+        }
+
+    def close(self):
+        self.set_many({})
+        self._conn.close()
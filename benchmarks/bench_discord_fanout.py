@@ -0,0 +1,500 @@
+"""
+Load test for the bot's Discord fan-out against a local fake of the Discord API.
+
+Runs the bot's real handlers with discord.py pointed at a stand-in REST API
+that adds configurable latency, enforces per-channel and per-interaction
+rate-limit buckets (with the usual X-RateLimit-* headers) and answers a
+share of requests with a shared-scope 429 and Retry-After:
+
+  join      on_guild_join for N guilds at once
+  slash     M concurrent /allgames, /epicgames, /steamgames and /dlconly
+            invocations, dispatched through the command tree
+  announce  check_free_games announcing every game to the N subscribed guilds
+  mixed     the slash burst while an announcement fan-out is in progress
+
+Store data comes from the replay fixtures (see bench_replay.py), so nothing
+touches the network. Reports end-to-end latency, messages/sec and 429s, and
+for slash commands how close the defer came to Discord's 3 second
+acknowledgement deadline and the last followup to the 15 minute token
+lifetime. Acknowledgements and followups that miss them are rejected the way
+Discord does.
+
+    python benchmarks/bench_discord_fanout.py [--guilds N] [--interactions M] [--latency-ms MS]
+        [--rate-limit-chance P] [--scenario NAME ...]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import pathlib
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import discord  # noqa: E402
+from aiohttp import web  # noqa: E402
+import bench_replay  # noqa: E402
+import http_client  # noqa: E402
+import logging_setup  # noqa: E402
+from guild_subscriptions import Subscription  # noqa: E402
+
+ACK_DEADLINE = 3.0
+FOLLOWUP_DEADLINE = 15 * 60
+SCENARIOS = ('join', 'slash', 'announce', 'mixed')
+SLASH_COMMANDS = ('allgames', 'epicgames', 'steamgames', 'dlconly')
+
+APPLICATION_ID = 1100000000000000000
+BOT_USER = {
+    'id': str(APPLICATION_ID), 'username': 'Free Games Bot', 'discriminator': '0000',
+    'global_name': None, 'avatar': None, 'bot': True,
+}
+MEMBER_USER = {
+    'id': '1200000000000000000', 'username': 'player', 'discriminator': '0',
+    'global_name': 'Player', 'avatar': None,
+}
+# VIEW_CHANNEL | SEND_MESSAGES | EMBED_LINKS
+EVERYONE_PERMISSIONS = str(1024 | 2048 | 16384)
+
+def _snowflake(counter):
+    return discord.utils.time_snowflake(discord.utils.utcnow()) + next(counter) % 4096
+
+def _iso_now():
+    return datetime.now(timezone.utc).isoformat()
+
+def _json_response(data, status=200, headers=None):
+    # discord.py only decodes bodies labelled exactly "application/json" (no charset)
+    return web.Response(body=json.dumps(data).encode(), status=status, headers=headers,
+                        content_type='application/json')
+
+def _percentiles(samples):
+    if not samples:
+        return "n/a"
+    ordered = sorted(samples)
+    pick = lambda fraction: ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+    return (f"p50 {pick(0.5) * 1000:.0f} ms, p95 {pick(0.95) * 1000:.0f} ms, "
+            f"p99 {pick(0.99) * 1000:.0f} ms, max {ordered[-1] * 1000:.0f} ms")
+
+class FakeDiscord:
+    """
+    The handful of Discord REST routes the bot uses.
+
+    Channel messages and interaction followups are limited to
+    `bucket_limit` requests per `bucket_window` seconds per channel or
+    interaction token; on top of that, `rate_limit_chance` of requests get
+    a shared-scope 429 with `retry_after`.
+    """
+
+    def __init__(self, latency=0.05, jitter=0.02, bucket_limit=5, bucket_window=5.0,
+                 rate_limit_chance=0.0, retry_after=0.5):
+        self.latency = latency
+        self.jitter = jitter
+        self.bucket_limit = bucket_limit
+        self.bucket_window = bucket_window
+        self.rate_limit_chance = rate_limit_chance
+        self.retry_after = retry_after
+
+        self.interactions = {}  # token -> (created wall time, channel id)
+        self._buckets = {}      # bucket key -> [window start, requests]
+        self._ids = itertools.count()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.requests = Counter()
+        self.rate_limited = Counter()
+        self.messages = 0
+        self.acks = {}                        # token -> seconds after the interaction was created
+        self.followups = defaultdict(list)    # token -> seconds after creation, per followup
+        self.rejected = Counter()
+
+    def app(self):
+        app = web.Application(client_max_size=8 * 1024 * 1024)
+        app.router.add_get('/api/v10/users/@me', self._current_user)
+        app.router.add_get('/api/v10/oauth2/applications/@me', self._application_info)
+        app.router.add_post('/api/v10/channels/{channel_id}/messages', self._create_message)
+        app.router.add_patch('/api/v10/channels/{channel_id}/messages/{message_id}', self._edit_message)
+        app.router.add_post('/api/v10/interactions/{interaction_id}/{token}/callback', self._interaction_callback)
+        app.router.add_post('/api/v10/webhooks/{application_id}/{token}', self._followup)
+        app.router.add_patch('/api/v10/webhooks/{application_id}/{token}/messages/{message_id}', self._edit_followup)
+        return app
+
+    async def _delay(self):
+        await asyncio.sleep(max(0.0, random.uniform(self.latency - self.jitter, self.latency + self.jitter)))
+
+    def _limit(self, route, bucket_key):
+        """A 429 response if this request is rate limited, else the rate-limit headers for a success"""
+        now = time.monotonic()
+        window = self._buckets.get(bucket_key)
+        if window is None or now - window[0] >= self.bucket_window:
+            window = self._buckets[bucket_key] = [now, 0]
+        reset_after = window[0] + self.bucket_window - now
+        headers = {
+            'X-RateLimit-Limit': str(self.bucket_limit),
+            'X-RateLimit-Reset': f'{time.time() + reset_after:.3f}',
+            'X-RateLimit-Reset-After': f'{reset_after:.3f}',
+            'X-RateLimit-Bucket': f'{route}:{bucket_key}',
+        }
+
+        if window[1] >= self.bucket_limit:
+            return self._too_many(route, 'user', reset_after, headers)
+        if self.rate_limit_chance and random.random() < self.rate_limit_chance:
+            return self._too_many(route, 'shared', self.retry_after, headers)
+
+        window[1] += 1
+        headers['X-RateLimit-Remaining'] = str(self.bucket_limit - window[1])
+        return headers
+
+    def _too_many(self, route, scope, retry_after, headers):
+        self.rate_limited[route] += 1
+        headers = dict(headers, **{
+            'X-RateLimit-Remaining': '0',
+            'X-RateLimit-Scope': scope,
+            'Retry-After': f'{retry_after:.3f}',
+            # Without it discord.py takes the 429 for a Cloudflare ban and gives up
+            'Via': '1.1 google',
+        })
+        return _json_response(
+            {'message': 'You are being rate limited.', 'retry_after': retry_after, 'global': False},
+            status=429, headers=headers
+        )
+
+    def _message(self, channel_id, payload):
+        return {
+            'id': str(_snowflake(self._ids)), 'channel_id': str(channel_id), 'type': 0,
+            'content': payload.get('content') or '', 'embeds': payload.get('embeds') or [],
+            'author': BOT_USER, 'attachments': [], 'mentions': [], 'mention_roles': [],
+            'mention_everyone': False, 'pinned': False, 'tts': False, 'flags': 0,
+            'timestamp': _iso_now(), 'edited_timestamp': None, 'components': [],
+        }
+
+    @staticmethod
+    async def _payload(request):
+        if request.content_type == 'application/json':
+            return await request.json()
+        data = await request.post()
+        return json.loads(data.get('payload_json') or '{}')
+
+    async def _current_user(self, request):
+        return _json_response(BOT_USER)
+
+    async def _application_info(self, request):
+        return _json_response({
+            'id': str(APPLICATION_ID), 'name': BOT_USER['username'], 'icon': None, 'description': '',
+            'rpc_origins': [], 'bot_public': True, 'bot_require_code_grant': False,
+            'owner': MEMBER_USER, 'verify_key': '0' * 64, 'flags': 0, 'team': None,
+        })
+
+    async def _create_message(self, request):
+        channel_id = request.match_info['channel_id']
+        self.requests['channel_message'] += 1
+        await self._delay()
+        limited = self._limit('channel_message', channel_id)
+        if isinstance(limited, web.Response):
+            return limited
+        self.messages += 1
+        return _json_response(self._message(channel_id, await self._payload(request)), headers=limited)
+
+    async def _edit_message(self, request):
+        channel_id = request.match_info['channel_id']
+        self.requests['channel_edit'] += 1
+        await self._delay()
+        limited = self._limit('channel_message', channel_id)
+        if isinstance(limited, web.Response):
+            return limited
+        message = self._message(channel_id, await self._payload(request))
+        message['id'] = request.match_info['message_id']
+        return _json_response(message, headers=limited)
+
+    async def _interaction_callback(self, request):
+        token = request.match_info['token']
+        self.requests['interaction_callback'] += 1
+        await self._delay()
+        created, _ = self.interactions[token]
+        elapsed = time.time() - created
+        if elapsed > ACK_DEADLINE:
+            self.rejected['late_ack'] += 1
+            return _json_response({'message': 'Unknown interaction', 'code': 10062}, status=404)
+        self.acks[token] = elapsed
+        payload = await self._payload(request)
+        return _json_response({'interaction': {
+            'id': request.match_info['interaction_id'], 'type': 2,
+            'response_message_loading': payload.get('type') == 5,
+        }})
+
+    async def _followup(self, request):
+        token = request.match_info['token']
+        self.requests['followup'] += 1
+        await self._delay()
+        created, channel_id = self.interactions[token]
+        elapsed = time.time() - created
+        if elapsed > FOLLOWUP_DEADLINE:
+            self.rejected['late_followup'] += 1
+            return _json_response({'message': 'Invalid Webhook Token', 'code': 50027}, status=401)
+        limited = self._limit('followup', token)
+        if isinstance(limited, web.Response):
+            return limited
+        self.messages += 1
+        self.followups[token].append(elapsed)
+        message = self._message(channel_id, await self._payload(request))
+        message['webhook_id'] = str(APPLICATION_ID)
+        if request.query.get('wait') not in ('true', '1'):
+            return web.Response(status=204, headers=limited)
+        return _json_response(message, headers=limited)
+
+    async def _edit_followup(self, request):
+        token = request.match_info['token']
+        self.requests['followup_edit'] += 1
+        await self._delay()
+        _, channel_id = self.interactions[token]
+        message = self._message(channel_id, await self._payload(request))
+        message['id'] = request.match_info['message_id']
+        return _json_response(message)
+
+async def _serve(app):
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+class Driver:
+    """Fake guilds and slash invocations fed into the bot's real client state"""
+
+    def __init__(self, bot_module, fake):
+        self.bot_module = bot_module
+        self.bot = bot_module.bot
+        self.fake = fake
+        self.guilds = []
+        self._ids = itertools.count()
+        self._completed = {}  # interaction id -> future set on completion
+        self.bot.add_listener(self._on_completion, 'on_app_command_completion')
+
+    async def _on_completion(self, interaction, command):
+        future = self._completed.get(interaction.id)
+        if future is not None and not future.done():
+            future.set_result(time.time())
+
+    def add_guilds(self, count):
+        """Add `count` guilds with one text channel each, every one subscribed to announcements"""
+        state = self.bot._connection
+        subscriptions = self.bot_module.subscriptions
+        for index in range(count):
+            guild_id = _snowflake(self._ids)
+            channel_id = guild_id + 1
+            guild = state._add_guild_from_data({
+                'id': str(guild_id), 'name': f'Guild {index}', 'owner_id': MEMBER_USER['id'],
+                'member_count': 2, 'features': [], 'emojis': [], 'stickers': [],
+                'system_channel_id': str(channel_id),
+                'roles': [{
+                    'id': str(guild_id), 'name': '@everyone', 'permissions': EVERYONE_PERMISSIONS,
+                    'position': 0, 'color': 0, 'hoist': False, 'managed': False, 'mentionable': False,
+                }],
+                'channels': [{'id': str(channel_id), 'type': 0, 'name': 'general', 'position': 0,
+                              'permission_overwrites': []}],
+                'members': [{'user': BOT_USER, 'roles': [], 'joined_at': _iso_now(), 'deaf': False, 'mute': False, 'flags': 0}],
+            })
+            self.guilds.append(guild)
+            # As if the guild had been joined already, so announce and mixed work on their own
+            subscriptions.save(Subscription(guild.id, channel_id))
+
+    def invoke(self, guild, command_name):
+        """Dispatch one slash command the way the gateway would; returns (token, completion future)"""
+        command = self.bot.tree.get_command(command_name)
+        channel = guild.text_channels[0]
+        created = discord.utils.utcnow()
+        interaction_id = discord.utils.time_snowflake(created) + next(self._ids) % 4096
+        token = f'token-{interaction_id}'
+        # Creation time as Discord sees it, i.e. millisecond precision of the snowflake
+        self.fake.interactions[token] = (discord.utils.snowflake_time(interaction_id).timestamp(), channel.id)
+        future = self._completed[interaction_id] = asyncio.get_running_loop().create_future()
+
+        self.bot._connection.parse_interaction_create({
+            'id': str(interaction_id), 'application_id': str(APPLICATION_ID), 'type': 2,
+            'token': token, 'version': 1, 'guild_id': str(guild.id), 'locale': 'en-US', 'guild_locale': 'en-US',
+            'channel': {'id': str(channel.id), 'type': 0, 'guild_id': str(guild.id), 'name': channel.name, 'position': 0},
+            'member': {'user': MEMBER_USER, 'roles': [], 'joined_at': _iso_now(), 'deaf': False, 'mute': False, 'flags': 0,
+                       'permissions': EVERYONE_PERMISSIONS},
+            'data': {'id': str(next(self._ids)), 'name': command.name, 'type': 1},
+            'app_permissions': EVERYONE_PERMISSIONS, 'attachment_size_limit': 10 * 1024 * 1024, 'entitlements': [],
+        })
+        return token, future
+
+# Scenarios
+
+def _report_traffic(fake, elapsed):
+    print(f"  wall time      {elapsed:.2f} s")
+    print(f"  messages       {fake.messages} ({fake.messages / elapsed if elapsed else 0:.1f}/s)")
+    print(f"  requests       {dict(fake.requests)}")
+    print(f"  429s           {dict(fake.rate_limited) or 0}")
+    if fake.rejected:
+        print(f"  rejected       {dict(fake.rejected)}")
+
+async def run_join(driver, fake):
+    async def join(guild):
+        started = time.perf_counter()
+        await driver.bot_module.on_guild_join(guild)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(join(guild) for guild in driver.guilds))
+    elapsed = time.perf_counter() - started
+    print(f"join: {len(driver.guilds)} guilds")
+    print(f"  per guild      {_percentiles(latencies)}")
+    _report_traffic(fake, elapsed)
+
+async def _slash_burst(driver, count, spread):
+    async def invoke(index):
+        if spread:
+            await asyncio.sleep(random.uniform(0, spread))
+        guild = driver.guilds[index % len(driver.guilds)]
+        token, future = driver.invoke(guild, SLASH_COMMANDS[index % len(SLASH_COMMANDS)])
+        try:
+            finished = await asyncio.wait_for(future, FOLLOWUP_DEADLINE)
+        except asyncio.TimeoutError:
+            finished = None
+        return token, finished
+
+    return await asyncio.gather(*(invoke(index) for index in range(count)))
+
+def _report_slash(fake, outcomes):
+    created = {token: fake.interactions[token][0] for token, _ in outcomes}
+    end_to_end = [finished - created[token] for token, finished in outcomes if finished is not None]
+    acks = [fake.acks[token] for token, _ in outcomes if token in fake.acks]
+    last_followups = [max(fake.followups[token]) for token, _ in outcomes if fake.followups.get(token)]
+
+    print(f"  end to end     {_percentiles(end_to_end)}")
+    print(f"  defer          {_percentiles(acks)}")
+    if acks:
+        print(f"  ack margin     min {ACK_DEADLINE - max(acks):.3f} s of {ACK_DEADLINE:.0f} s, "
+              f"{sum(ack > ACK_DEADLINE / 2 for ack in acks)} past half the deadline")
+    print(f"  last followup  {_percentiles(last_followups)}")
+    if last_followups:
+        print(f"  token margin   min {FOLLOWUP_DEADLINE - max(last_followups):.1f} s of {FOLLOWUP_DEADLINE} s")
+    unanswered = len(outcomes) - len(acks)
+    if unanswered:
+        print(f"  not deferred   {unanswered}")
+
+async def run_slash(driver, fake, count, spread):
+    started = time.perf_counter()
+    outcomes = await _slash_burst(driver, count, spread)
+    elapsed = time.perf_counter() - started
+    print(f"slash: {count} invocations over {len(driver.guilds)} guilds")
+    _report_slash(fake, outcomes)
+    _report_traffic(fake, elapsed)
+
+def _reset_announcements(bot_module):
+    bot_module.snapshot_tracker.reset()
+    bot_module.announcements.clear()
+
+async def run_announce(driver, fake):
+    _reset_announcements(driver.bot_module)
+    started = time.perf_counter()
+    await driver.bot_module.check_free_games(force=True)
+    elapsed = time.perf_counter() - started
+    print(f"announce: check_free_games to {len(driver.bot_module.subscriptions.all())} subscribed guilds")
+    _report_traffic(fake, elapsed)
+
+async def run_mixed(driver, fake, count, spread):
+    _reset_announcements(driver.bot_module)
+    started = time.perf_counter()
+    check = asyncio.create_task(driver.bot_module.check_free_games(force=True))
+    # Let the check get its fan-out going first
+    await asyncio.sleep(0.2)
+    outcomes = await _slash_burst(driver, count, spread)
+    await check
+    elapsed = time.perf_counter() - started
+    print(f"mixed: {count} invocations during an announcement to "
+          f"{len(driver.bot_module.subscriptions.all())} subscribed guilds")
+    _report_slash(fake, outcomes)
+    _report_traffic(fake, elapsed)
+
+async def main_async(args, workdir):
+    fake = FakeDiscord(args.latency_ms / 1000, args.jitter_ms / 1000, args.bucket_limit,
+                       args.bucket_window, args.rate_limit_chance, args.retry_after)
+    discord_runner, discord_url = await _serve(fake.app())
+    discord.http.Route.BASE = f'{discord_url}/api/v10'
+
+    fixtures = {args.fixture: bench_replay.Fixture(args.fixture)}
+    store_runner, store_url = await bench_replay.start_stub_server(fixtures)
+    bench_replay.point_fetchers_at(store_url, args.fixture)
+    # Upcoming-game images are checked with HEAD requests; keep those local too
+    fixture = fixtures[args.fixture]
+    fixture.epic_body = fixture.epic_body.replace(b'https://cdn1.epicgames.com/', f'{store_url}/cdn/'.encode())
+
+    # bot.py reads config.json and creates its databases in the working directory
+    os.chdir(workdir)
+    import bot as bot_module
+    import steam_games
+    from app_type_cache import AppTypeCache
+    steam_games._APP_TYPE_CACHE = AppTypeCache(':memory:')
+    bot_module.log_listener.stop()
+    log_listener = logging_setup.setup_logging(workdir / 'bot.log', level=args.log_level)
+    logging.getLogger('discord').setLevel(logging.WARNING)
+    # Tracebacks belong on the console here, not in the throwaway log
+    sys.excepthook = sys.__excepthook__
+
+    driver = Driver(bot_module, fake)
+    try:
+        await bot_module.bot.login('fake-token')
+        driver.add_guilds(args.guilds)
+        # Warm the store snapshots so the runs measure Discord traffic, not store fetches
+        await bot_module.scan_providers(refresh=True)
+
+        scenarios = {
+            'join': lambda: run_join(driver, fake),
+            'slash': lambda: run_slash(driver, fake, args.interactions, args.spread),
+            'announce': lambda: run_announce(driver, fake),
+            'mixed': lambda: run_mixed(driver, fake, args.interactions, args.spread),
+        }
+        for name in args.scenario:
+            fake.reset_stats()
+            await scenarios[name]()
+            print()
+        print(f"Outbound scheduler: {bot_module.outbound.stats()}")
+    finally:
+        bot_module.launch_stager.close()
+        await bot_module.outbound.close()
+        await bot_module.bot.http.close()
+        await http_client.close_session()
+        await store_runner.cleanup()
+        await discord_runner.cleanup()
+        log_listener.stop()
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--guilds', type=int, default=100)
+    arg_parser.add_argument('--interactions', type=int, default=200)
+    arg_parser.add_argument('--spread', type=float, default=0.0,
+                            help="spread slash invocations over this many seconds (default: all at once)")
+    arg_parser.add_argument('--latency-ms', type=float, default=50)
+    arg_parser.add_argument('--jitter-ms', type=float, default=20)
+    arg_parser.add_argument('--bucket-limit', type=int, default=5, help="requests per bucket window")
+    arg_parser.add_argument('--bucket-window', type=float, default=5.0, help="bucket window in seconds")
+    arg_parser.add_argument('--rate-limit-chance', type=float, default=0.01,
+                            help="share of requests answered with a shared 429")
+    arg_parser.add_argument('--retry-after', type=float, default=0.5)
+    arg_parser.add_argument('--fixture', choices=bench_replay.SIZES, default='typical')
+    arg_parser.add_argument('--scenario', choices=SCENARIOS, action='append',
+                            help="scenario to run (repeatable; default: all, in order)")
+    arg_parser.add_argument('--log-level', default='INFO')
+    args = arg_parser.parse_args()
+    args.scenario = args.scenario or list(SCENARIOS)
+
+    with tempfile.TemporaryDirectory(prefix='fanout-') as workdir:
+        workdir = pathlib.Path(workdir)
+        (workdir / 'config.json').write_text(json.dumps({'channel_id': 0, 'check_interval_hours': 1}))
+        cwd = os.getcwd()
+        try:
+            asyncio.run(main_async(args, workdir))
+        finally:
+            os.chdir(cwd)
+
+if __name__ == "__main__":
+    main()
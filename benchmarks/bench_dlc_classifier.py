@@ -0,0 +1,132 @@
+"""
+Accuracy and speed of the DLC classifier against the detectors it replaced.
+
+Scores both on the labelled cases in benchmarks/fixtures/dlc_cases.json
+(the legacy result is what the bot ended up showing: the fetcher's verdict
+OR'ed with the re-check in embeds), then times classifying every Epic
+catalog element and Steam row of the replay fixtures, with the classifier's
+text cache cold and warm, and the per-render DLC check in create_embed.
+
+    python benchmarks/bench_dlc_classifier.py [--runs N]
+"""
+import argparse
+import json
+import pathlib
+import statistics
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import dlc_classifier  # noqa: E402
+from bench_replay import SIZES, Fixture  # noqa: E402
+
+FIXTURES = ROOT / 'benchmarks' / 'fixtures'
+
+# The three detectors as they were before dlc_classifier
+
+def _legacy_epic(game, title, description, product_slug):
+    offer_type = str(game.get('offerType', '')).lower()
+    categories = game.get('categories', [])
+    category_text = " ".join(
+        str(cat.get('path', '')) + " " + str(cat.get('name', ''))
+        for cat in categories
+        if isinstance(cat, dict)
+    ).lower()
+    text = " ".join([title, description, product_slug or '', offer_type, category_text]).lower()
+    markers = ['dlc', 'add-on', 'addon', 'expansion', 'season pass', 'soundtrack']
+    return any(marker in text for marker in markers)
+
+def _legacy_steam(title, description, game_url, app_type=None):
+    if app_type:
+        return app_type == 'dlc'
+    text = f"{title} {description} {game_url}".lower()
+    markers = [' dlc', '/dlc/', 'add-on', 'addon', 'expansion', 'season pass', 'soundtrack']
+    return any(marker in text for marker in markers)
+
+def _legacy_content(is_dlc, title, description, url):
+    if is_dlc:
+        return True
+    text = " ".join([title or '', description or '', url or '']).lower()
+    markers = [' dlc', 'downloadable content', 'add-on', 'addon', 'expansion pass', 'season pass', 'soundtrack']
+    return any(marker in text for marker in markers)
+
+def _legacy_case(case):
+    if case['store'] == 'epic':
+        element = case['element']
+        fetched = _legacy_epic(element, element['title'], element['description'], case['slug'])
+        return _legacy_content(fetched, element['title'], element['description'], case['slug'])
+    fetched = _legacy_steam(case['title'], case['description'], case['url'], case['app_type'])
+    return _legacy_content(fetched, case['title'], case['description'], case['url'])
+
+def _classify_case(case):
+    if case['store'] == 'epic':
+        return dlc_classifier.is_epic_dlc(case['element'], case['slug'])
+    return dlc_classifier.is_steam_dlc(case['title'], case['description'], case['url'], case['app_type'])
+
+def report_accuracy():
+    cases = json.loads((FIXTURES / 'dlc_cases.json').read_text(encoding='utf-8'))
+    for label, classify in [('legacy', _legacy_case), ('dlc_classifier', _classify_case)]:
+        wrong = [case for case in cases if classify(case) != case['expected']]
+        print(f"{label:<16} {len(cases) - len(wrong)}/{len(cases)} correct")
+        for case in wrong:
+            title = case['element']['title'] if case['store'] == 'epic' else case['title']
+            print(f"    {case['store']:<6} {title!r}: expected {case['expected']} ({case['note']})")
+
+# Timing
+
+def _median_ms(func, runs, setup=None):
+    timings = []
+    for _ in range(runs):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+def report_speed(runs):
+    print(f"\n{'fixture':<13} {'path':<26} {'items':>6} {'median ms':>10} {'us/item':>8}")
+    for size in SIZES:
+        fixture = Fixture(size)
+        elements = fixture.epic_elements
+        rows = [(game.title, game.description, game.url) for game in fixture.steam_games]
+        items = len(elements) + len(rows)
+
+        def legacy():
+            for element in elements:
+                slug = element.get('productSlug') or ''
+                _legacy_epic(element, element.get('title', ''), element.get('description', ''), slug)
+            for title, description, url in rows:
+                _legacy_steam(title, description, url)
+
+        def classifier():
+            for element in elements:
+                dlc_classifier.is_epic_dlc(element, element.get('productSlug') or '')
+            for title, description, url in rows:
+                dlc_classifier.is_steam_dlc(title, description, url)
+
+        games = fixture.games
+        variants = [
+            ('fetch: legacy', legacy, None, items),
+            ('fetch: classifier (cold)', classifier, dlc_classifier.has_dlc_markers.cache_clear, items),
+            ('fetch: classifier (warm)', classifier, None, items),
+            ('render: legacy re-check',
+             lambda: [_legacy_content(game.is_dlc, game.title, game.description, game.url) for game in games],
+             None, len(games)),
+            ('render: record flag', lambda: [dlc_classifier.is_dlc(game) for game in games], None, len(games)),
+        ]
+        for label, func, setup, count in variants:
+            median = _median_ms(func, runs, setup)
+            print(f"{size:<13} {label:<26} {count:>6} {median:>10.3f} {median * 1000 / max(count, 1):>8.2f}")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--runs', type=int, default=50)
+    args = arg_parser.parse_args()
+    report_accuracy()
+    report_speed(args.runs)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Offline replay benchmarks for the Epic and Steam pipelines.
+
+Replays the saved `freeGamesPromotions` payloads and Steam search pages in
+benchmarks/fixtures (small, typical and pathological) through parsing, DLC
+detection, embed rendering and the announcement diff, then runs the real
+async fetch paths against a local stub server standing in for Epic and
+Steam, so nothing touches the network. Reports ops/sec, p50/p99 latency and
+the allocation peak and block count of one operation.
+
+    python benchmarks/bench_replay.py [--runs N] [--size NAME] [--no-fetch]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import pathlib
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from aiohttp import web  # noqa: E402
+import dlc_classifier  # noqa: E402
+import embeds  # noqa: E402
+import epic_games  # noqa: E402
+import http_client  # noqa: E402
+import steam_games  # noqa: E402
+from app_type_cache import AppTypeCache  # noqa: E402
+from currency_rates import CurrencyRates, http_rates_source  # noqa: E402
+from free_game import Platform  # noqa: E402
+from providers import StoreProvider  # noqa: E402
+from snapshot_diff import diff_snapshots  # noqa: E402
+
+FIXTURES = ROOT / 'benchmarks' / 'fixtures'
+SIZES = ('small', 'typical', 'pathological')
+RATES_BODY = (FIXTURES / 'currency_rates.json').read_bytes()
+
+# Stand-ins for the providers bot.py registers, for what embeds read from them
+RENDER_PROVIDERS = {
+    Platform.EPIC: StoreProvider('epic', 'Epic Games', epic_games.get_epic_free_games_async, 0x2E3440,
+                                 embeds.EPIC_HEADER, embeds.EPIC_DLC_HEADER, 0, emoji='🏪'),
+    Platform.STEAM: StoreProvider('steam', 'Steam', steam_games.get_steam_free_games_async, 0x1B2838,
+                                  embeds.STEAM_HEADER, embeds.STEAM_DLC_HEADER, 0, emoji='⚙️'),
+}
+
+def _percentile(sorted_timings, fraction):
+    index = min(len(sorted_timings) - 1, int(round(fraction * (len(sorted_timings) - 1))))
+    return sorted_timings[index]
+
+def _report(size, name, items, timings, peak, blocks):
+    timings.sort()
+    mean = statistics.fmean(timings)
+    print(f"{size:<13} {name:<22} {items:>6} {1 / mean if mean else 0:>10.1f} "
+          f"{_percentile(timings, 0.5) * 1000:>9.3f} {_percentile(timings, 0.99) * 1000:>9.3f} "
+          f"{peak / 1024:>9.0f} {blocks:>8}")
+
+def _allocations(snapshot_before, snapshot_after):
+    stats = snapshot_after.compare_to(snapshot_before, 'filename')
+    return sum(max(0, stat.count_diff) for stat in stats)
+
+def measure(size, name, func, runs, setup=None):
+    """Time func() `runs` times (after one warm-up), then trace one more call"""
+    if setup:
+        setup()
+    items = len(func())
+    timings = []
+    for _ in range(runs):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    func()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    _report(size, name, items, timings, peak, _allocations(before, after))
+
+async def measure_async(size, name, coro_func, runs, setup=None):
+    """measure() for coroutines, awaited on the running loop"""
+    if setup:
+        setup()
+    items = len(await coro_func())
+    timings = []
+    for _ in range(runs):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        await coro_func()
+        timings.append(time.perf_counter() - start)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    await coro_func()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    _report(size, name, items, timings, peak, _allocations(before, after))
+
+# Fixtures
+
+class Fixture:
+    """One size's recorded Epic payload and Steam page, split the way the stub serves them"""
+
+    def __init__(self, size):
+        self.size = size
+        self.epic_body = (FIXTURES / f'epic_promotions_{size}.json').read_bytes()
+        self.epic_etag = '"' + hashlib.sha256(self.epic_body).hexdigest()[:16] + '"'
+        self.steam_page = (FIXTURES / f'steam_search_{size}.html').read_bytes()
+        self.steam_rows = [str(row) for row in steam_games._parse_result_rows(self.steam_page)]
+
+        self.epic_elements = json.loads(self.epic_body)['data']['Catalog']['searchStore']['elements']
+        self.epic_games = epic_games._parse_epic_games(json.loads(self.epic_body))
+        self.steam_games = steam_games._parse_free_game_rows(self.steam_page, limit=None)
+        self.games = self.epic_games + self.steam_games
+
+    def next_snapshot(self):
+        """The snapshot a later check would see: a tenth ended, a tenth changed, a few new"""
+        games = list(self.games)
+        step = max(1, len(games) // 10)
+        current = [game for index, game in enumerate(games) if index % step != 0]
+        current = [game.replace(ends_at=(game.ends_at or 0) + 3600) if index % step == 1 else game
+                   for index, game in enumerate(current)]
+        current += [game.replace(id=f'{game.id}-next') for game in games[:step]]
+        return current
+
+# Local stand-in for the Epic and Steam endpoints
+
+def _stub_app(fixtures):
+    async def epic_promotions(request):
+        fixture = fixtures[request.match_info['size']]
+        if request.headers.get('If-None-Match') == fixture.epic_etag:
+            return web.Response(status=304, headers={'ETag': fixture.epic_etag})
+        return web.Response(body=fixture.epic_body, content_type='application/json',
+                            headers={'ETag': fixture.epic_etag})
+
+    async def steam_search_page(request):
+        fixture = fixtures[request.match_info['size']]
+        return web.Response(body=fixture.steam_page, content_type='text/html')
+
+    async def steam_search_results(request):
+        fixture = fixtures[request.match_info['size']]
+        start = int(request.query.get('start', 0))
+        count = int(request.query.get('count', steam_games.SEARCH_PAGE_SIZE))
+        return web.json_response({
+            'success': 1,
+            'results_html': ''.join(fixture.steam_rows[start:start + count]),
+            'total_count': len(fixture.steam_rows),
+        })
+
+    async def steam_app_details(request):
+        app_ids = request.query.get('appids', '').split(',')
+        return web.json_response({
+            app_id: {'success': True, 'data': {'type': 'dlc' if int(app_id or 0) % 7 == 0 else 'game'}}
+            for app_id in app_ids
+        })
+
+    async def exchange_rates(request):
+        return web.Response(body=RATES_BODY, content_type='application/json')
+
+    async def cdn_image(request):
+        return web.Response(content_type='image/jpeg')
+
+    app = web.Application()
+    app.router.add_get('/{size}/epic/freeGamesPromotions', epic_promotions)
+    app.router.add_get('/{size}/steam/search/', steam_search_page)
+    app.router.add_get('/{size}/steam/search/results/', steam_search_results)
+    app.router.add_get('/{size}/steam/api/appdetails', steam_app_details)
+    app.router.add_get('/rates/latest/USD', exchange_rates)
+    app.router.add_route('HEAD', '/cdn/{path:.*}', cdn_image)
+    return app
+
+async def start_stub_server(fixtures):
+    """Serve the fixtures on an ephemeral localhost port; returns (runner, base URL)"""
+    runner = web.AppRunner(_stub_app(fixtures), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f'http://127.0.0.1:{port}'
+
+def point_fetchers_at(base_url, size):
+    epic_games.EPIC_API_URL = f'{base_url}/{size}/epic/freeGamesPromotions'
+    steam_games.SEARCH_PAGE_URL = f'{base_url}/{size}/steam/search/'
+    steam_games.SEARCH_RESULTS_URL = f'{base_url}/{size}/steam/search/results/'
+    steam_games.APP_DETAILS_URL = f'{base_url}/{size}/steam/api/appdetails'
+
+def _forget_epic_fetch():
+    epic_games._last_fetch.update(etag=None, last_modified=None, body_hash=None, games=None)
+
+# Cases
+
+def run_offline(fixture, runs):
+    size = fixture.size
+    measure(size, 'epic parse', lambda: epic_games._parse_epic_games(json.loads(fixture.epic_body)), runs)
+    measure(size, 'steam parse', lambda: steam_games._parse_free_game_rows(fixture.steam_page, limit=None), runs)
+
+    def detect_dlc():
+        flags = [dlc_classifier.is_epic_dlc(element, element.get('productSlug') or '')
+                 for element in fixture.epic_elements]
+        flags.extend(dlc_classifier.is_steam_dlc(game.title, game.description, game.url)
+                     for game in fixture.steam_games)
+        return flags
+    measure(size, 'dlc detect (cold)', detect_dlc, runs, setup=dlc_classifier.has_dlc_markers.cache_clear)
+
+    def render(currency):
+        return [embeds.create_embed(game, RENDER_PROVIDERS[game.platform], currency) for game in fixture.games]
+    measure(size, 'create_embed cold', lambda: render('USD'), runs, setup=embeds.invalidate_embeds)
+    measure(size, 'create_embed warm', lambda: render('USD'), runs)
+    measure(size, 'create_embed EUR', lambda: render('EUR'), runs, setup=embeds.invalidate_embeds)
+
+    # Every game's price in every display currency, as after a rates update
+    rates = CurrencyRates()
+    games = fixture.games
+
+    def bump_rates_version():
+        rates.version += 1
+    measure(size, 'price tables', lambda: [rates.price_table(game) for game in games], runs,
+            setup=bump_rates_version)
+
+    current = fixture.next_snapshot()
+    measure(size, 'snapshot diff', lambda: diff_snapshots(fixture.games, current).events, runs)
+
+async def run_fetches(fixture, base_url, runs):
+    size = fixture.size
+    point_fetchers_at(base_url, size)
+    await measure_async(size, 'epic fetch 200', epic_games.get_epic_free_games_async, runs, setup=_forget_epic_fetch)
+    await measure_async(size, 'epic fetch 304', epic_games.get_epic_free_games_async, runs)
+    await measure_async(size, 'steam fetch json', lambda: steam_games.get_steam_free_games_async('json'), runs)
+    await measure_async(size, 'steam fetch html', lambda: steam_games.get_steam_free_games_async('html'), runs)
+    rates = CurrencyRates(source=http_rates_source(f'{base_url}/rates/latest/USD'))
+
+    async def refresh_rates():
+        await rates.refresh(force=True)
+        return rates.rates
+    await measure_async(size, 'rates refresh', refresh_rates, runs)
+
+async def main_async(args):
+    fixtures = {size: Fixture(size) for size in args.size}
+    print(f"{'size':<13} {'case':<22} {'items':>6} {'ops/sec':>10} {'p50 ms':>9} {'p99 ms':>9} "
+          f"{'peak KiB':>9} {'blocks':>8}")
+    for fixture in fixtures.values():
+        run_offline(fixture, args.runs)
+
+    if args.no_fetch:
+        return
+    # Keep the bot's on-disk app type cache out of it; warm lookups after the first run
+    steam_games._APP_TYPE_CACHE = AppTypeCache(':memory:')
+    runner, base_url = await start_stub_server(fixtures)
+    try:
+        for fixture in fixtures.values():
+            await run_fetches(fixture, base_url, args.runs)
+    finally:
+        await http_client.close_session()
+        await runner.cleanup()
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--runs', type=int, default=30)
+    arg_parser.add_argument('--size', choices=SIZES, action='append',
+                            help="fixture size to replay (repeatable; default: all)")
+    arg_parser.add_argument('--no-fetch', action='store_true', help="skip the stub-server fetch cases")
+    args = arg_parser.parse_args()
+    args.size = args.size or list(SIZES)
+    asyncio.run(main_async(args))
+
+if __name__ == "__main__":
+    main()
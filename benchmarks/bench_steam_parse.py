@@ -0,0 +1,95 @@
+"""
+Micro-benchmark for Steam search page parsing.
+
+Compares the original approach (full html.parser tree plus a BeautifulSoup
+per tooltip) with the row-scoped SoupStrainer path, for every available
+parser backend, on the saved search pages in benchmarks/fixtures.
+
+    python benchmarks/bench_steam_parse.py [--runs N]
+"""
+import argparse
+import pathlib
+import statistics
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+ROOT = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from bs4 import BeautifulSoup  # noqa: E402
+import steam_games  # noqa: E402
+
+FIXTURES = ROOT / 'benchmarks' / 'fixtures'
+
+def _legacy_rows(content, parser=None):
+    soup = BeautifulSoup(content, 'html.parser')
+    return soup.find_all('a', class_='search_result_row')
+
+def _legacy_strip(text):
+    return BeautifulSoup(text, 'html.parser').get_text() if '<' in text else text
+
+@contextmanager
+def _legacy_parsing():
+    """Temporarily swap steam_games back to full-tree parsing"""
+    rows, strip = steam_games._parse_result_rows, steam_games._strip_tags
+    steam_games._parse_result_rows, steam_games._strip_tags = _legacy_rows, _legacy_strip
+    try:
+        yield
+    finally:
+        steam_games._parse_result_rows, steam_games._strip_tags = rows, strip
+
+@contextmanager
+def _scoped_parsing(parser):
+    rows = steam_games._parse_result_rows
+    steam_games._parse_result_rows = lambda content: rows(content, parser)
+    try:
+        yield
+    finally:
+        steam_games._parse_result_rows = rows
+
+def _available_parsers():
+    parsers = ['html.parser']
+    try:
+        import lxml  # noqa: F401
+        parsers.append('lxml')
+    except ImportError:
+        pass
+    return parsers
+
+def _measure(content, runs):
+    def parse():
+        # No row limit, so every row on the page is extracted
+        return steam_games._parse_free_game_rows(content, limit=None)
+
+    rows = parse()
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        parse()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    parse()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(rows), statistics.median(timings), peak
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument('--runs', type=int, default=20)
+    args = arg_parser.parse_args()
+
+    print(f"{'fixture':<34} {'path':<22} {'rows':>5} {'median ms':>10} {'peak KiB':>10}")
+    for fixture in sorted(FIXTURES.glob('steam_search_*.html')):
+        content = fixture.read_bytes()
+        variants = [('full tree (legacy)', _legacy_parsing())]
+        variants += [(f"rows only / {parser}", _scoped_parsing(parser)) for parser in _available_parsers()]
+        for label, patch in variants:
+            with patch:
+                rows, median, peak = _measure(content, args.runs)
+            print(f"{fixture.name:<34} {label:<22} {rows:>5} {median * 1000:>10.2f} {peak / 1024:>10.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -1,72 +1,169 @@
 import discord
+from discord import app_commands
 from discord.ext import commands, tasks
 import json
 import os
 from datetime import datetime
 from dotenv import load_dotenv
-from epic_games import get_epic_free_games
-from steam_games import get_steam_free_games
+from epic_games import get_epic_free_games_async, get_epic_fetch_stats
+from steam_games import get_steam_free_games_async, get_app_type_cache_stats
+from snapshot_diff import SnapshotTracker
+from circuit_breaker import CircuitOpenError
+from providers import StoreProvider, register_provider, get_provider, all_providers, scan_providers
+from launch_staging import LaunchStager
+from check_schedule import AdaptiveSchedule, promotion_boundaries, FAST_INTERVAL_SECONDS
+from http_client import close_session
+from announcement_store import AnnouncementStore
+from guild_subscriptions import Subscription, SubscriptionStore
+from delivery import deliver_announcements, expire_announcements
+from outbound import OutboundScheduler, PRIORITY_INTERACTION
+from embed_batching import send_embed_pages
+from dlc_classifier import is_dlc, classifier_stats
+from currency_rates import CURRENCIES, DEFAULT_SOURCE_URL, get_rates, rates_source
+from logging_setup import setup_logging
+from metrics import (
+    CallbackGauge, start_metrics_server, CHECK_SECONDS, COMMAND_SECONDS, COMMAND_ERRORS, ANNOUNCEMENTS
+)
+from embeds import (
+    EPIC_HEADER, STEAM_HEADER, EPIC_DLC_HEADER, STEAM_DLC_HEADER,
+    create_embed, create_ended_embed, build_listing_embeds, filter_dlc_games, invalidate_embeds
+)
 import asyncio
-import traceback
-import re
-import sys
+import time
+import logging
 import pathlib
-from datetime import datetime as _dt
 
 # Load environment variables
 load_dotenv()
 
-# Redirect stdout/stderr to bot.log so prints are captured when using pythonw.exe
-try:
-    log_path = pathlib.Path(__file__).parent / 'bot.log'
-    log_file = open(log_path, 'a', encoding='utf-8', buffering=1)
-    sys.stdout = log_file
-    sys.stderr = log_file
-    print(f"{_dt.utcnow().isoformat()}Z - Bot process started (logging redirected)")
-except Exception:
-    # If logging redirect fails, continue without crashing
-    pass
-
 # Bot setup
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix="!", intents=intents)
+# Every outgoing message goes through this queue; it learns bucket state from Discord's response headers
+outbound = OutboundScheduler()
+bot = commands.Bot(command_prefix="!", intents=intents, http_trace=outbound.trace_config())
+
+# Values read when /metrics is scraped
+CallbackGauge('freegames_guilds', 'Guilds the bot is in', (), lambda: {(): len(bot.guilds)})
+CallbackGauge('freegames_outbound_queue_depth', 'Messages waiting in the outbound queue', (), lambda: {(): outbound.queue_depth})
+CallbackGauge(
+    'freegames_outbound_messages', 'Outbound messages by result', ('result',),
+    lambda: {('sent',): outbound.sent, ('failed',): outbound.failed,
+             ('expired',): outbound.expired, ('rate_limited',): outbound.rate_limited},
+    type='counter'
+)
+CallbackGauge(
+    'freegames_epic_fetches', 'Epic fetches by outcome', ('result',),
+    lambda: {(key,): value for key, value in get_epic_fetch_stats().items()},
+    type='counter'
+)
+CallbackGauge(
+    'freegames_steam_app_type_cache', 'Steam app-type cache entries and lookup counters', ('stat',),
+    lambda: {(key,): value for key, value in get_app_type_cache_stats().items()}
+)
+CallbackGauge(
+    'freegames_dlc_text_cache', 'DLC classifier text cache entries and lookup counters', ('stat',),
+    lambda: {(key,): value for key, value in classifier_stats().items()}
+)
 
 # Load config
 with open('config.json', 'r') as f:
     config = json.load(f)
 
+# Logging goes through a queue to a rotating bot.log (also captures output under pythonw.exe)
+log_listener = setup_logging(
+    pathlib.Path(__file__).parent / 'bot.log',
+    level=config.get('log_level', 'INFO'),
+    json_format=config.get('log_format', 'text') == 'json',
+    rotation=config.get('log_rotation', 'size'),
+    max_bytes=config.get('log_max_bytes', 5 * 1024 * 1024),
+    backup_count=config.get('log_backup_count', 5)
+)
+logger = logging.getLogger('bot')
+logger.info("Bot process started")
+
 CHANNEL_ID = config['channel_id']
 CHECK_INTERVAL = config['check_interval_hours']
+SNAPSHOT_TTL = config.get('snapshot_ttl_seconds', 600)
+STEAM_SEARCH_MODE = config.get('steam_search_mode', 'json')
+STEAM_MAX_PAGES = config.get('steam_max_pages', 4)
+FAST_CHECK_INTERVAL = config.get('fast_check_interval_seconds', FAST_INTERVAL_SECONDS)
+METRICS_HOST = config.get('metrics_host', '127.0.0.1')
+METRICS_PORT = config.get('metrics_port', 9108)
+CURRENCY_RATES_SOURCE = config.get('currency_rates_source', DEFAULT_SOURCE_URL)
+CURRENCY_RATES_REFRESH_HOURS = config.get('currency_rates_refresh_hours', 12)
+
+# Exchange rates for displayed prices: cached on disk, refreshed in the background
+currency_rates = get_rates()
+currency_rates.source = rates_source(CURRENCY_RATES_SOURCE) if CURRENCY_RATES_SOURCE else None
+currency_rates.refresh_interval = CURRENCY_RATES_REFRESH_HOURS * 3600
+CallbackGauge(
+    'freegames_currency_rates_age_seconds', 'Age of the exchange rates used for prices', (),
+    lambda: {(): currency_rates.stats()['age_seconds'] or 0}
+)
+
+# Store providers: each one's snapshot cache is read by commands and warmed by the periodic check
+register_provider(StoreProvider(
+    'epic', 'Epic Games', get_epic_free_games_async, 0x2E3440, EPIC_HEADER, EPIC_DLC_HEADER,
+    SNAPSHOT_TTL, timeout=12, scan_timeout=20,
+    emoji='🏪', icon_url="https://cdn.discordapp.com/emojis/1234567890.png"
+))
+register_provider(StoreProvider(
+    'steam', 'Steam', lambda: get_steam_free_games_async(STEAM_SEARCH_MODE, STEAM_MAX_PAGES),
+    0x1B2838, STEAM_HEADER, STEAM_DLC_HEADER,
+    SNAPSHOT_TTL, timeout=15, scan_timeout=25,
+    emoji='⚙️'
+))
+
+CallbackGauge(
+    'freegames_circuit_state', 'Store circuit breaker state (0 closed, 0.5 half-open, 1 open)', ('provider',),
+    lambda: {(provider.key,): {'closed': 0, 'half_open': 0.5, 'open': 1}[provider.breaker.state] for provider in all_providers()}
+)
+
+def freshness_notes(providers):
+    """The "data as of" notes of every provider currently serving an old snapshot, or None"""
+    notes = [note for note in (provider.freshness_note() for provider in providers) if note]
+    return "\n".join(notes) or None
+
+def listing_sections(results, dlc_only=False):
+    """build_listing_embeds() sections for a list of scan results"""
+    sections = []
+    for result in results:
+        provider = result.provider
+        if dlc_only:
+            sections.append((provider.dlc_header, filter_dlc_games(result.games), provider))
+        else:
+            sections.append((provider.header, result.games, provider))
+    return sections
 
-# Database file to track announced games
-DB_FILE = 'announced_games.json'
-
-def load_database():
-    """Load the database of already announced games"""
-    if os.path.exists(DB_FILE):
-        with open(DB_FILE, 'r') as f:
-            return json.load(f)
-    return {'epic': [], 'steam': []}
-
-def save_database(db):
-    """Save the database of announced games"""
-    with open(DB_FILE, 'w') as f:
-        json.dump(db, f, indent=2)
-
-# Currency conversion rates (USD base)
-CURRENCY_RATES = {
-    'USD': {'symbol': '$', 'rate': 1.0, 'name': 'US Dollar'},
-    'EUR': {'symbol': '€', 'rate': 0.92, 'name': 'Euro'},
-    'GBP': {'symbol': '£', 'rate': 0.79, 'name': 'British Pound'},
-    'CAD': {'symbol': 'C$', 'rate': 1.36, 'name': 'Canadian Dollar'},
-    'AUD': {'symbol': 'A$', 'rate': 1.53, 'name': 'Australian Dollar'},
-    'JPY': {'symbol': '¥', 'rate': 149.50, 'name': 'Japanese Yen'},
-    'INR': {'symbol': '₹', 'rate': 83.12, 'name': 'Indian Rupee'},
-    'BRL': {'symbol': 'R$', 'rate': 4.97, 'name': 'Brazilian Real'},
-    'MXN': {'symbol': 'MX$', 'rate': 17.08, 'name': 'Mexican Peso'},
-    'PHP': {'symbol': '₱', 'rate': 55.50, 'name': 'Philippine Peso'},
-}
+# Database of already announced games (imports the old JSON file once)
+DB_FILE = 'announced_games.db'
+LEGACY_DB_FILE = 'announced_games.json'
+announcements = AnnouncementStore(DB_FILE, legacy_json_path=LEGACY_DB_FILE)
+
+# Per-guild announcement channels and preferences
+subscriptions = SubscriptionStore(DB_FILE)
+
+def get_active_subscriptions():
+    """
+    All guild subscriptions, plus the legacy config channel for its guild if
+    that guild hasn't set up its own subscription or opted out.
+    """
+    active = subscriptions.all()
+    legacy = legacy_subscription()
+    if legacy is not None:
+        active.append(legacy)
+    return active
+
+def legacy_subscription():
+    """The implicit subscription of the config channel's guild, or None if it doesn't apply"""
+    legacy_channel = bot.get_channel(CHANNEL_ID) if CHANNEL_ID else None
+    if legacy_channel is None:
+        return None
+    guild_id = legacy_channel.guild.id
+    if subscriptions.get(guild_id) is not None or subscriptions.is_unsubscribed(guild_id):
+        return None
+    return Subscription(guild_id, CHANNEL_ID, ping_everyone=True)
 
 # Map Discord locales to currencies
 LOCALE_TO_CURRENCY = {
@@ -79,29 +176,6 @@ LOCALE_TO_CURRENCY = {
     'es-MX': 'MXN', 'fil': 'PHP',
 }
 
-def convert_price(price_str, target_currency='USD'):
-    """Convert price string to target currency"""
-    if not price_str or price_str in ['Free', 'Paid Game', 'Full Game Access']:
-        return price_str
-
-    # Extract number from price string
-    match = re.search(r'[\d.]+', price_str)
-    if not match:
-        return price_str
-
-    try:
-        usd_amount = float(match.group())
-        currency_info = CURRENCY_RATES.get(target_currency, CURRENCY_RATES['USD'])
-        converted = usd_amount * currency_info['rate']
-
-        # Format based on currency
-        if target_currency == 'JPY':
-            return f"{currency_info['symbol']}{int(converted)}"
-        else:
-            return f"{currency_info['symbol']}{converted:.2f}"
-    except:
-        return price_str
-
 def get_user_currency(interaction: discord.Interaction = None):
     """Detect user's currency from their Discord locale"""
     if interaction and hasattr(interaction, 'locale'):
@@ -109,111 +183,6 @@ def get_user_currency(interaction: discord.Interaction = None):
         return LOCALE_TO_CURRENCY.get(locale, 'USD')
     return 'USD'
 
-def is_dlc_content(game):
-    """Best-effort DLC detector across Epic/Steam payloads."""
-    if game.get('is_dlc') is True:
-        return True
-
-    text = " ".join([
-        str(game.get('title', '')),
-        str(game.get('description', '')),
-        str(game.get('url', '')),
-        str(game.get('content_type', '')),
-    ]).lower()
-
-    dlc_markers = [
-        ' dlc',
-        'downloadable content',
-        'add-on',
-        'addon',
-        'expansion pass',
-        'season pass',
-        'soundtrack',
-    ]
-
-    return any(marker in text for marker in dlc_markers)
-
-def filter_dlc_games(games):
-    """Return only DLC/add-on entries from a game list."""
-    return [game for game in games if is_dlc_content(game)]
-
-def create_embed(game, platform, currency='USD'):
-    """Create a modern rich embed for game announcement"""
-    # Modern color scheme
-    color_map = {
-        'Epic Games': 0x2E3440,  # Dark modern gray
-        'Steam': 0x1B2838,       # Steam's dark blue-gray
-    }
-    color = color_map.get(platform, 0x2E3440)
-
-    # Create embed with modern styling
-    embed = discord.Embed(
-        title="",  # Empty title for cleaner look
-        description="",  # Will add content below
-        color=color,
-        timestamp=datetime.now()
-    )
-
-    # Add game title as author for modern look
-    embed.set_author(
-        name=f"🎮 {game['title']}",
-        icon_url="https://cdn.discordapp.com/emojis/1234567890.png" if platform == 'Epic Games' else None
-    )
-
-    # Main description with platform badge
-    platform_emoji = "🏪" if platform == "Epic Games" else "⚙️"
-    status_badge = "```ansi\n\u001b[0;32m● FREE NOW\u001b[0m\n```"
-    dlc_badge = "```ansi\n\u001b[0;33m● DLC / ADD-ON\u001b[0m\n```" if is_dlc_content(game) else ""
-
-    embed.description = f"{platform_emoji} **{platform}**\n{status_badge}{dlc_badge}"
-
-    # Add description in a modern card style
-    if game.get('description'):
-        desc_text = game['description'][:180] + "..." if len(game['description']) > 180 else game['description']
-        embed.add_field(
-            name="📝 About",
-            value=f">>> {desc_text}",
-            inline=False
-        )
-
-    # Price and availability in a compact row
-    info_row = []
-
-    if game.get('original_price'):
-        converted_price = convert_price(game['original_price'], currency)
-        currency_name = CURRENCY_RATES.get(currency, {}).get('name', currency)
-        info_row.append(f"💰 ~~{converted_price}~~ **FREE**")
-
-    if game.get('end_date'):
-        info_row.append(f"⏰ Until **{game['end_date']}**")
-
-    if info_row:
-        embed.add_field(
-            name="💎 Deal Information",
-            value="\n".join(info_row),
-            inline=False
-        )
-
-    # Modern CTA button style
-    embed.add_field(
-        name="",
-        value=f"### [🎁 Claim Now →]({game['url']})\n*Click above to get this game for free!*",
-        inline=False
-    )
-
-    # Set thumbnail/image
-    if game.get('image'):
-        embed.set_image(url=game['image'])
-
-    # Modern footer
-    platform_icon = "🎮" if platform == "Epic Games" else "⚙️"
-    embed.set_footer(
-        text=f"{platform_icon} Free Games Notifier • Powered by {platform}",
-        icon_url=None
-    )
-
-    return embed
-
 def create_modern_help_embed(currency='USD'):
     """Create modern help embed"""
     embed = discord.Embed(
@@ -236,7 +205,7 @@ def create_modern_help_embed(currency='USD'):
     I automatically scan **Epic Games** and **Steam** for free games and notify you instantly!
 
     🌍 Prices shown in **{currency}** based on your location
-    """.format(currency=CURRENCY_RATES.get(currency, {}).get('name', currency))
+    """.format(currency=CURRENCIES.get(currency, {}).get('name', currency))
 
     # Commands section
     embed.add_field(
@@ -248,6 +217,8 @@ def create_modern_help_embed(currency='USD'):
             "/dlconly      • Show DLC giveaways\n"
             "/epicgames    • Check Epic store\n"
             "/steamgames   • Check Steam store\n"
+            "/subscribe    • Set announcement channel (Admin)\n"
+            "/subscription • Show announcement settings\n"
             "```"
         ),
         inline=False
@@ -287,28 +258,31 @@ def create_modern_help_embed(currency='USD'):
 
 @bot.event
 async def on_ready():
-    print(f'{bot.user} has connected to Discord!')
-    print(f'Bot is in {len(bot.guilds)} server(s)')
+    logger.info("%s has connected to Discord!", bot.user)
+    logger.info("Bot is in %d server(s)", len(bot.guilds))
 
     # Sync slash commands with Discord
     try:
         synced = await bot.tree.sync()
-        print(f'Synced {len(synced)} slash command(s)')
+        logger.info("Synced %d slash command(s)", len(synced))
     except Exception as e:
-        print(f'Failed to sync commands: {e}')
+        logger.error("Failed to sync commands: %s", e)
 
     if not check_free_games.is_running():
         check_free_games.start()
-        print(f'Started checking for free games every {CHECK_INTERVAL} hour(s)')
+        logger.info("Started checking for free games at least every %s hour(s)", CHECK_INTERVAL)
+
+    if currency_rates.source is not None and not refresh_currency_rates.is_running():
+        refresh_currency_rates.start()
 
-    # Extra debug: list registered app commands
-    for cmd in bot.tree.get_commands():
-        print(f"Registered slash command: /{cmd.name} - {cmd.description}")
+    if logger.isEnabledFor(logging.DEBUG):
+        for cmd in bot.tree.get_commands():
+            logger.debug("Registered slash command: /%s - %s", cmd.name, cmd.description)
 
 @bot.event
 async def on_guild_join(guild):
     """When bot joins a new server, send current free games to the first available channel"""
-    print(f"Bot joined new server: {guild.name} (ID: {guild.id})")
+    logger.info("Bot joined new server: %s (ID: %s)", guild.name, guild.id)
 
     # Find a channel where we can send messages
     target_channel = None
@@ -324,9 +298,13 @@ async def on_guild_join(guild):
                 break
 
     if not target_channel:
-        print(f"  ✗ Could not find a channel to send welcome message in {guild.name}")
+        logger.warning("Could not find a channel to send welcome message in %s", guild.name)
         return
 
+    # Announce in the welcome channel until an admin runs /subscribe
+    if subscriptions.get(guild.id) is None:
+        subscriptions.save(Subscription(guild.id, target_channel.id))
+
     # Send welcome message
     welcome_embed = discord.Embed(
         title="",
@@ -370,55 +348,39 @@ async def on_guild_join(guild):
     welcome_embed.set_footer(text="🎮 Free Games Notifier • Let's find some free games!")
 
     try:
-        await target_channel.send(embed=welcome_embed)
-        print(f"  ✓ Sent welcome message to #{target_channel.name}")
+        await outbound.channel_send(target_channel, embed=welcome_embed)
+        logger.info("Sent welcome message to #%s", target_channel.name)
     except Exception as e:
-        print(f"  ✗ Failed to send welcome message: {e}")
+        logger.error("Failed to send welcome message: %s", e)
 
     # Fetch and send current free games
     try:
-        print(f"  Fetching current free games for {guild.name}...")
-
-        # Epic Games
-        epic_games = get_epic_free_games()
-        if epic_games:
-            header_embed = discord.Embed(
-                description="```ansi\n\u001b[0;34m🏪 EPIC GAMES STORE\u001b[0m\n```",
-                color=0x2E3440
-            )
-            await target_channel.send(embed=header_embed)
-
-            for game in epic_games:
-                embed = create_embed(game, 'Epic Games', 'USD')
-                await target_channel.send(embed=embed)
-                await asyncio.sleep(0.5)
-            print(f"  ✓ Sent {len(epic_games)} Epic game(s)")
-
-        # Steam Games
-        steam_games = get_steam_free_games()
-        if steam_games:
-            header_embed = discord.Embed(
-                description="```ansi\n\u001b[0;36m⚙️ STEAM STORE\u001b[0m\n```",
-                color=0x1B2838
-            )
-            await target_channel.send(embed=header_embed)
-
-            for game in steam_games:
-                embed = create_embed(game, 'Steam', 'USD')
-                await target_channel.send(embed=embed)
-                await asyncio.sleep(0.5)
-            print(f"  ✓ Sent {len(steam_games)} Steam game(s)")
+        logger.info("Fetching current free games for %s", guild.name)
+
+        results = await scan_providers()
+        embeds = build_listing_embeds(listing_sections(results))
+        # Nobody is around to click page buttons here, so send every page
+        await send_embed_pages(
+            lambda **kwargs: outbound.channel_send(target_channel, **kwargs),
+            embeds,
+            paginate=False
+        )
+        for result in results:
+            logger.info("Sent %d %s game(s)", len(result.games), result.provider.name)
 
-        if not epic_games and not steam_games:
+        if not any(result.games for result in results):
             no_games_embed = discord.Embed(
                 description="```ansi\n\u001b[0;33m⏳ No free games right now\u001b[0m\n```\nBut I'll notify you the moment something drops!",
                 color=0xFEE75C
             )
-            await target_channel.send(embed=no_games_embed)
+            await outbound.channel_send(target_channel, embed=no_games_embed)
 
     except Exception as e:
-        print(f"  ✗ Error fetching/sending free games: {e}")
-        await target_channel.send("⚠️ I had trouble fetching current free games, but I'll keep checking automatically!")
+        logger.error("Error fetching/sending free games: %s", e)
+        await outbound.channel_send(
+            target_channel,
+            content="⚠️ I had trouble fetching current free games, but I'll keep checking automatically!"
+        )
 
 @bot.event
 async def on_message(message):
@@ -426,235 +388,383 @@ async def on_message(message):
     if message.author == bot.user:
         return
 
-    # Debug: print all messages the bot sees
-    print(f'[Message Received] {message.author}: {message.content}')
+    # Message tracing is opt-in (log_level DEBUG); the check keeps it free otherwise
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Message received from %s: %s", message.author, message.content)
 
     # Process commands
     await bot.process_commands(message)
 
-@tasks.loop(hours=CHECK_INTERVAL)
-async def check_free_games():
-    """Check for free games periodically"""
-    print(f"[{datetime.now()}] Checking for free games...")
+# Snapshot each store was last checked against, so a check only handles what changed
+snapshot_tracker = SnapshotTracker()
+
+# Checks every CHECK_INTERVAL hours, but every few seconds around known promotion boundaries
+check_schedule = AdaptiveSchedule(CHECK_INTERVAL * 3600, FAST_CHECK_INTERVAL)
+# When each provider's next scan is due (epoch seconds); each follows its own boundaries,
+# so a store without any keeps the slow cadence while another is in its fast window
+_next_scan_at = {}
 
-    channel = bot.get_channel(CHANNEL_ID)
-    if not channel:
-        print(f"Error: Could not find channel with ID {CHANNEL_ID}")
+# Games being delivered right now, so a launch timer and a check can't both post one
+_announcing = set()
+
+async def announce_games(provider, games, render_embed=None):
+    """Deliver the games not announced yet to every subscribed channel; returns those that reached them all"""
+    new_games = [
+        game for game in games
+        if not announcements.is_announced(provider.key, game.id) and (provider.key, game.id) not in _announcing
+    ]
+    if not new_games:
+        return []
+    subscriptions = get_active_subscriptions()
+    if not subscriptions:
+        # Left unannounced, so they go out once a server subscribes
+        return []
+
+    if render_embed is None:
+        render_embed = lambda game, currency: create_embed(game, provider, currency)
+
+    claimed = [(provider.key, game.id) for game in new_games]
+    _announcing.update(claimed)
+    try:
+        # Channels that got a game on an earlier attempt that failed elsewhere
+        sent = {
+            (game.id, channel_id)
+            for game in new_games
+            for channel_id, _, _ in announcements.posted_messages(provider.key, game.id)
+        }
+        channels, failed = await deliver_announcements(
+            bot, subscriptions, provider.key, new_games,
+            render_embed,
+            is_dlc,
+            outbound.channel_send,
+            on_sent=lambda subscription, game, message: announcements.record_message(
+                provider.key, game.id, message.channel.id, message.id, subscription.currency, game
+            ),
+            already_sent=lambda channel_id, game: (game.id, channel_id) in sent
+        )
+        delivered = [game for game in new_games if game.id not in failed]
+        ANNOUNCEMENTS.labels(provider.key).inc(len(delivered))
+        for game in delivered:
+            announcements.mark_announced(provider.key, game.id, game.title)
+            logger.info("Announced %s game: %s (%d channel(s))", provider.name, game.title, channels)
+        for game in new_games:
+            if game.id in failed:
+                logger.warning("%s game %s didn't reach every channel; retrying next check", provider.name, game.title)
+    finally:
+        _announcing.difference_update(claimed)
+    return delivered
+
+# Upcoming promotions, rendered ahead of time and announced the moment they start
+launch_stager = LaunchStager(announce_games, create_embed)
+
+@tasks.loop(hours=CHECK_INTERVAL)
+async def check_free_games(force=False):
+    """Check the stores that are due (or all of them with `force`) for free games"""
+    now = time.time()
+    # A second of slack so a loop that wakes marginally early still finds its store due
+    due = [provider for provider in all_providers() if force or _next_scan_at.get(provider.key, 0) <= now + 1]
+    if not due:
+        schedule_next_check()
         return
+    logger.info("Checking for free games on %s...", ", ".join(provider.name for provider in due))
+    check_started = time.perf_counter()
+
+    active_subscriptions = get_active_subscriptions()
+    if not active_subscriptions:
+        logger.info("No subscribed channels; refreshing snapshots only")
 
-    db = load_database()
     new_games_found = False
 
-    # Check Epic Games
-    try:
-        epic_games = await asyncio.wait_for(asyncio.to_thread(get_epic_free_games), timeout=20)
-        for game in epic_games:
-            game_id = game['id']
-            if game_id not in db['epic']:
-                # New free game found!
-                try:
-                    await channel.send(content=f"@everyone New free game available: {game.get('title', 'Untitled')}", allowed_mentions=discord.AllowedMentions(everyone=True))
-                except Exception:
-                    # If pinging fails (permissions), continue without stopping announcements
-                    pass
-
-                embed = create_embed(game, 'Epic Games')
-                await channel.send(embed=embed)
-                db['epic'].append(game_id)
-                new_games_found = True
-                print(f"  ✓ Announced Epic game: {game['title']}")
-    except asyncio.TimeoutError:
-        print("  ✗ Epic check timed out")
-    except Exception as e:
-        print(f"  ✗ Error checking Epic Games: {e}")
+    # All stores are fetched concurrently, each within its own deadline
+    for result in await scan_providers(due, refresh=True):
+        provider = result.provider
+        logger.info("Scanned %s", provider.name, extra={
+            'event': 'scan',
+            'provider': provider.key,
+            'games': len(result.games),
+            'upcoming': len(result.upcoming),
+            'error': repr(result.error) if result.error is not None else None,
+            'duration_ms': round(result.duration * 1000, 1),
+        })
+        if result.timed_out:
+            logger.warning("%s check timed out", provider.name)
+            continue
+        if result.error is not None:
+            logger.warning("Error checking %s: %s", provider.name, result.error)
+            continue
+
+        # Failed fetches were skipped above, so an empty list means nothing is free
+        # right now and every game of the previous snapshot lands in diff.removed
+        games = result.games
+        if not result.complete:
+            # A truncated snapshot (e.g. Steam's 10-row HTML fallback) can't show that
+            # a game ended, so the games it doesn't reach carry over from the last one
+            seen = {game.id for game in games}
+            games = games + [game for game in snapshot_tracker.last(provider.key) or () if game.id not in seen]
+        try:
+            first_snapshot = snapshot_tracker.last(provider.key) is None
+            diff = snapshot_tracker.update(provider.key, games)
+
+            # Games whose end date passed, and games with live announcements that are
+            # no longer on offer. The latter come from the stored messages rather than
+            # the diff, so games that left while the bot was offline (the tracker starts
+            # empty) or whose edit failed last time are caught too.
+            now = time.time()
+            ended = [game for game in games if game.ends_at is not None and game.ends_at <= now]
+            if result.complete:
+                on_offer = {game.id for game in games} | {game.id for game in result.upcoming}
+                ended += [game for game_id, game in announcements.posted_games(provider.key).items()
+                          if game_id not in on_offer]
+            if ended:
+                edited = await expire_announcements(
+                    bot, announcements, provider.key, ended,
+                    lambda game, currency, provider=provider: create_ended_embed(game, provider, currency),
+                    outbound.message_edit
+                )
+                if edited:
+                    logger.info("Marked %d %s announcement(s) as ended", edited, provider.name)
+
+            # Stage upcoming promotions for the currencies guilds actually use
+            await launch_stager.sync(
+                provider, result.upcoming,
+                {subscription.currency for subscription in active_subscriptions}
+            )
 
-    # Check Steam
-    try:
-        steam_games = await asyncio.wait_for(asyncio.to_thread(get_steam_free_games), timeout=25)
-        for game in steam_games:
-            game_id = game['id']
-            if game_id not in db['steam']:
-                # New free game found!
-                try:
-                    await channel.send(content=f"@everyone New free game available: {game.get('title', 'Untitled')}", allowed_mentions=discord.AllowedMentions(everyone=True))
-                except Exception:
-                    pass
-
-                embed = create_embed(game, 'Steam')
-                await channel.send(embed=embed)
-                db['steam'].append(game_id)
+            # Every live game rather than just diff.added, so one whose delivery
+            # failed is retried; announced ones are filtered out cheaply
+            ended_ids = {game.id for game in ended}
+            if await announce_games(provider, [game for game in games if game.id not in ended_ids]):
                 new_games_found = True
-                print(f"  ✓ Announced Steam game: {game['title']}")
-    except asyncio.TimeoutError:
-        print("  ✗ Steam check timed out")
-    except Exception as e:
-        print(f"  ✗ Error checking Steam: {e}")
+
+            if not diff:
+                if first_snapshot and result.complete:
+                    # Nothing free at startup: stamp games that ended while the bot was offline
+                    announcements.record_snapshot(provider.key, [])
+                logger.info("%s snapshot unchanged since last check", provider.name)
+                continue
+            logger.info("%s: %d added, %d changed, %d removed", provider.name, len(diff.added), len(diff.changed), len(diff.removed))
+
+            # Only drop the embeds of games that changed or are gone
+            stale_ids = [game.id for game in diff.removed] + [previous.id for previous, _ in diff.changed]
+            if stale_ids:
+                invalidate_embeds(provider.key, stale_ids)
+
+            for previous, game in diff.changed:
+                logger.info("%s game changed: %s", provider.name, game.title)
+            for game in diff.removed:
+                logger.info("%s game no longer free: %s", provider.name, game.title)
+            if result.complete:
+                announcements.record_snapshot(provider.key, [game.id for game in games])
+        except Exception as e:
+            logger.exception("Error announcing %s games: %s", provider.name, e)
+            # Start over next time so nothing from this diff is lost
+            snapshot_tracker.reset(provider.key)
 
     if new_games_found:
-        save_database(db)
-        print(f"  Database updated!")
+        logger.info("Database updated!")
     else:
-        print(f"  No new free games found.")
+        logger.info("No new free games found.")
+
+    pruned = announcements.prune()
+    if pruned:
+        logger.info("Pruned %d long-expired game(s) from the database", pruned)
+
+    logger.info("Check stats", extra={
+        'event': 'check_stats',
+        'epic_fetches': get_epic_fetch_stats(),
+        'steam_app_type_cache': get_app_type_cache_stats(),
+        'outbound': outbound.stats(),
+        'circuit_breakers': {provider.key: provider.breaker.stats() for provider in all_providers()},
+    })
+
+    CHECK_SECONDS.observe(time.perf_counter() - check_started)
+
+    # Each scanned store is due again just before its next promotion boundary, or
+    # after the regular interval; wake up for whichever store is due first
+    now = time.time()
+    for provider in due:
+        boundaries = promotion_boundaries(snapshot_tracker.last(provider.key) or ())
+        boundaries |= promotion_boundaries(launch_stager.staged_games(provider.key))
+        _next_scan_at[provider.key] = now + check_schedule.next_delay(boundaries, now)
+    schedule_next_check()
+
+def schedule_next_check():
+    """Wake the check loop when the first store is due"""
+    now = time.time()
+    wake_at = max(now + 1, min(_next_scan_at.get(provider.key, now) for provider in all_providers()))
+    # The loop measures its interval from the start of the current iteration, not from now
+    started = check_free_games._last_iteration if check_free_games.is_running() else None
+    base = started.timestamp() if started else now
+    check_free_games.change_interval(seconds=wake_at - base)
+    logger.info("Next check in %.1f minute(s)", (wake_at - now) / 60)
+
+@tasks.loop(hours=1)
+async def refresh_currency_rates():
+    """Fetch new exchange rates once the current ones are older than the refresh interval"""
+    try:
+        if await currency_rates.refresh():
+            # Cached embeds show prices at the old rates
+            invalidate_embeds()
+            logger.info("Currency rates updated (%d currencies)", len(currency_rates.rates))
+    except Exception as e:
+        logger.warning("Currency rate refresh failed; keeping the current rates: %s", e)
 
 @bot.command(name='checkgames')
 @commands.has_permissions(administrator=True)
 async def manual_check(ctx):
     """Manually trigger a check for free games (Admin only)"""
-    await ctx.send("🔍 Checking for free games...")
-    await check_free_games()
+    await _reply(ctx, "🔍 Checking for free games...")
+    await check_free_games(force=True)
 
-@bot.command(name='epicgames')
-async def show_epic(ctx):
-    """Show current Epic Games free games"""
+async def _show_store(ctx, key):
+    """Reply with one store's current free games"""
+    provider = get_provider(key)
     try:
-        games = get_epic_free_games()
+        games = await provider.get()
         if not games:
-            await ctx.send("No free games currently available on Epic Games Store.")
+            await _reply(ctx, f"No free games currently available on {provider.name}.")
             return
 
-        for game in games:
-            embed = create_embed(game, 'Epic Games')
-            await ctx.send(embed=embed)
+        await send_embed_pages(
+            _channel_sender(ctx.channel),
+            build_listing_embeds([(None, games, provider)]),
+            content=provider.freshness_note()
+        )
+    except CircuitOpenError:
+        await _reply(ctx, f"⚠️ {provider.name} isn't responding right now. Please try again in a few minutes.")
     except Exception as e:
-        await ctx.send(f"Error fetching Epic Games: {e}")
+        await _reply(ctx, f"Error fetching {provider.name} games: {e}")
 
-@bot.command(name='steamgames')
-async def show_steam(ctx):
-    """Show current Steam free games"""
+async def _show_listing(ctx, dlc_only=False):
+    """Reply with every store's current free games (or only DLC)"""
     try:
-        games = get_steam_free_games()
-        if not games:
-            await ctx.send("No free games currently available on Steam.")
+        results = await scan_providers()
+        if all(result.error is not None for result in results):
+            if any(result.timed_out for result in results):
+                await _reply(ctx, "⏱️ Timed out fetching game data. Please try again.")
+            else:
+                await _reply(ctx, "⚠️ The stores aren't responding right now. Please try again in a few minutes.")
             return
 
-        for game in games:
-            embed = create_embed(game, 'Steam')
-            await ctx.send(embed=embed)
+        embeds = build_listing_embeds(listing_sections(results, dlc_only))
+        if not embeds:
+            if dlc_only:
+                await _reply(ctx, "No DLC/add-on giveaways are currently detected on any store.")
+            else:
+                await _reply(ctx, "No free games currently available on any store.")
+            return
+
+        notes = freshness_notes(result.provider for result in results)
+        await send_embed_pages(_channel_sender(ctx.channel), embeds, content=notes)
     except Exception as e:
-        await ctx.send(f"Error fetching Steam games: {e}")
+        await _reply(ctx, f"Error fetching games: {e}")
+
+@bot.command(name='epicgames')
+async def show_epic(ctx):
+    """Show current Epic Games free games"""
+    await _show_store(ctx, 'epic')
+
+@bot.command(name='steamgames')
+async def show_steam(ctx):
+    """Show current Steam free games"""
+    await _show_store(ctx, 'steam')
 
 @bot.command(name='allgames')
 async def show_all_games(ctx):
     """Show all free games from both Epic and Steam"""
-    try:
-        epic_games = get_epic_free_games()
-        steam_games = get_steam_free_games()
-        
-        if not epic_games and not steam_games:
-            await ctx.send("No free games currently available on Epic Games or Steam.")
-            return
-        
-        if epic_games:
-            header_embed = discord.Embed(
-                description="```ansi\n\u001b[0;34m🏪 EPIC GAMES STORE\u001b[0m\n```",
-                color=0x2E3440
-            )
-            await ctx.send(embed=header_embed)
-            for game in epic_games:
-                embed = create_embed(game, 'Epic Games')
-                await ctx.send(embed=embed)
-                await asyncio.sleep(0.3)
-        
-        if steam_games:
-            header_embed = discord.Embed(
-                description="```ansi\n\u001b[0;36m⚙️ STEAM STORE\u001b[0m\n```",
-                color=0x1B2838
-            )
-            await ctx.send(embed=header_embed)
-            for game in steam_games:
-                embed = create_embed(game, 'Steam')
-                await ctx.send(embed=embed)
-                await asyncio.sleep(0.3)
-                
-    except Exception as e:
-        await ctx.send(f"Error fetching games: {e}")
+    await _show_listing(ctx)
 
 @bot.command(name='dlconly')
 async def show_dlc_only(ctx):
     """Show only DLC/add-on giveaways from Epic and Steam"""
-    try:
-        epic_games = filter_dlc_games(get_epic_free_games())
-        steam_games = filter_dlc_games(get_steam_free_games())
-
-        if not epic_games and not steam_games:
-            await ctx.send("No DLC/add-on giveaways are currently detected on Epic or Steam.")
-            return
-
-        if epic_games:
-            header_embed = discord.Embed(
-                description="```ansi\n\u001b[0;34m🏪 EPIC DLC GIVEAWAYS\u001b[0m\n```",
-                color=0x2E3440
-            )
-            await ctx.send(embed=header_embed)
-            for game in epic_games:
-                embed = create_embed(game, 'Epic Games')
-                await ctx.send(embed=embed)
-                await asyncio.sleep(0.3)
-
-        if steam_games:
-            header_embed = discord.Embed(
-                description="```ansi\n\u001b[0;36m⚙️ STEAM DLC GIVEAWAYS\u001b[0m\n```",
-                color=0x1B2838
-            )
-            await ctx.send(embed=header_embed)
-            for game in steam_games:
-                embed = create_embed(game, 'Steam')
-                await ctx.send(embed=embed)
-                await asyncio.sleep(0.3)
-
-    except Exception as e:
-        await ctx.send(f"Error fetching DLC giveaways: {e}")
+    await _show_listing(ctx, dlc_only=True)
 
 @bot.command(name='cleardb')
 @commands.has_permissions(administrator=True)
 async def clear_database(ctx):
     """Clear the database of announced games (Admin only)"""
-    db = {'epic': [], 'steam': []}
-    save_database(db)
-    await ctx.send("✅ Database cleared! All games will be announced again on next check.")
+    announcements.clear()
+    snapshot_tracker.reset()
+    await _reply(ctx, "✅ Database cleared! All games will be announced again on next check.")
 
 @bot.command(name='help_freegames')
 async def help_command(ctx):
     """Show help information"""
     embed = create_modern_help_embed('USD')
-    await ctx.send(embed=embed)
+    await outbound.channel_send(ctx.channel, PRIORITY_INTERACTION, embed=embed)
 
 # Slash Commands
 ##############################
 # Helpers & Error Handling
 ##############################
 
-async def _send_embed_list(interaction: discord.Interaction, games, platform: str):
-    """Send a list of game embeds for a platform, chunking to avoid rate limits."""
+def _channel_sender(channel):
+    """send(**kwargs) for a command reply in a channel, queued ahead of announcements"""
+    return lambda **kwargs: outbound.channel_send(channel, PRIORITY_INTERACTION, **kwargs)
+
+async def _reply(ctx, content):
+    """Answer a text command through the outbound queue, ahead of announcements"""
+    return await outbound.channel_send(ctx.channel, PRIORITY_INTERACTION, content=content)
+
+def _followup_sender(interaction: discord.Interaction):
+    """send(**kwargs) for interaction followups that returns the sent message"""
+    return lambda **kwargs: outbound.followup(interaction, wait=True, **kwargs)
+
+async def _send_embed_list(interaction: discord.Interaction, games, provider, note=None):
+    """Send a list of game embeds for a store, packed into as few messages as possible."""
     if not games:
         embed = discord.Embed(
-            description=f"```ansi\n\u001b[0;33m⚠ No free games available\u001b[0m\n```\nNo free games currently on {platform}, but I'm checking every hour!",
+            description=f"```ansi\n\u001b[0;33m⚠ No free games available\u001b[0m\n```\nNo free games currently on {provider.name}, but I'm checking every hour!",
             color=0xFEE75C
         )
-        await interaction.followup.send(embed=embed)
+        if note:
+            await outbound.followup(interaction, content=note, embed=embed)
+        else:
+            await outbound.followup(interaction, embed=embed)
         return
 
     # Detect user currency
     currency = get_user_currency(interaction)
 
-    # Discord rate limiting: send sequentially
-    for game in games:
-        embed = create_embed(game, platform, currency)
-        await interaction.followup.send(embed=embed)
-        await asyncio.sleep(0.3)  # small delay to be gentle
+    embeds = build_listing_embeds([(None, games, provider)], currency)
+    await send_embed_pages(_followup_sender(interaction), embeds, content=note)
+
+def _log_command_latency(kind, name, created_at):
+    """JSON-friendly record of how long a command took from the user's message or click"""
+    latency = (discord.utils.utcnow() - created_at).total_seconds()
+    COMMAND_SECONDS.labels(kind, name).observe(latency)
+    logger.info("Command %s completed", name, extra={
+        'event': 'command', 'kind': kind, 'command': name, 'latency_ms': round(latency * 1000, 1),
+    })
+
+@bot.event
+async def on_command_completion(ctx):
+    _log_command_latency('text', ctx.command.qualified_name, ctx.message.created_at)
+
+@bot.event
+async def on_command_error(ctx, error):
+    if isinstance(error, commands.CommandNotFound):
+        return
+    COMMAND_ERRORS.labels(ctx.command.qualified_name if ctx.command else 'unknown').inc()
+    logger.error("!%s error: %s", ctx.command, error, exc_info=error)
+
+@bot.event
+async def on_app_command_completion(interaction: discord.Interaction, command):
+    _log_command_latency('slash', command.qualified_name, interaction.created_at)
 
 @bot.tree.error
 async def on_app_command_error(interaction: discord.Interaction, error: Exception):
     """Global error handler for app (slash) commands."""
-    print("[Slash Command Error]", repr(error))
-    traceback.print_exception(type(error), error, error.__traceback__)
+    logger.error("Slash command error: %r", error, exc_info=error)
+    COMMAND_ERRORS.labels(interaction.command.qualified_name if interaction.command else 'unknown').inc()
     try:
         if interaction.response.is_done():
-            await interaction.followup.send("⚠️ An error occurred while processing that command.", ephemeral=True)
+            await outbound.followup(interaction, content="⚠️ An error occurred while processing that command.", ephemeral=True)
         else:
             await interaction.response.send_message("⚠️ An error occurred while processing that command.", ephemeral=True)
     except Exception as send_err:
-        print("[Error sending error message]", send_err)
+        logger.error("Error sending error message: %s", send_err)
+
 @bot.tree.command(name="commands", description="Show all available bot commands")
 async def slash_commands(interaction: discord.Interaction):
     """Show all available commands using slash command"""
@@ -662,204 +772,214 @@ async def slash_commands(interaction: discord.Interaction):
     embed = create_modern_help_embed(currency)
     await interaction.response.send_message(embed=embed)
 
-@bot.tree.command(name="epicgames", description="Show current Epic Games free games")
-async def slash_epic(interaction: discord.Interaction):
-    """Show current Epic Games free games via slash command"""
-    print("[/epicgames invoked]")
+async def _defer(interaction: discord.Interaction, command_name: str):
+    """Acknowledge the interaction so we have 15 minutes for followups"""
     try:
+        if not interaction.response.is_done():
+            await interaction.response.defer(thinking=True)
+    except Exception as e:
+        logger.warning("/%s defer failed: %s", command_name, e)
+
+async def _report_slash_error(interaction: discord.Interaction, command_name: str, error: Exception, message: str):
+    logger.error("/%s error: %s", command_name, error, exc_info=error)
+    COMMAND_ERRORS.labels(command_name).inc()
+    try:
+        if interaction.response.is_done():
+            await outbound.followup(interaction, content=message, ephemeral=True)
+        else:
+            await interaction.response.send_message(message, ephemeral=True)
+    except Exception as send_err:
+        logger.error("Error sending error message: %s", send_err)
+
+async def _slash_store(interaction: discord.Interaction, command_name: str, key: str):
+    """Answer a single-store slash command"""
+    provider = get_provider(key)
+    logger.debug("/%s invoked", command_name)
+    try:
+        await _defer(interaction, command_name)
+        # The provider deadline makes sure we always answer
         try:
-            if not interaction.response.is_done():
-                await interaction.response.defer(thinking=True)
-        except Exception as e:
-            print(f"[/epicgames defer failed] {e}")
-        # Timeout the fetch so we always answer
-        try:
-            games = await asyncio.wait_for(asyncio.to_thread(get_epic_free_games), timeout=12)
+            games = await provider.get()
         except asyncio.TimeoutError:
-            await interaction.followup.send("⏱️ Timed out fetching Epic Games data. Please try again in a moment.", ephemeral=True)
+            await outbound.followup(interaction, content=f"⏱️ Timed out fetching {provider.name} data. Please try again in a moment.", ephemeral=True)
+            return
+        except CircuitOpenError:
+            await outbound.followup(interaction, content=f"⚠️ {provider.name} isn't responding right now. Please try again in a few minutes.", ephemeral=True)
             return
-        await _send_embed_list(interaction, games, 'Epic Games')
+        await _send_embed_list(interaction, games, provider, provider.freshness_note())
     except Exception as e:
-        print(f"[/epicgames error] {e}")
-        traceback.print_exception(type(e), e, e.__traceback__)
-        try:
-            if interaction.response.is_done():
-                await interaction.followup.send("⚠️ Error fetching Epic Games.", ephemeral=True)
+        await _report_slash_error(interaction, command_name, e, f"⚠️ Error fetching {provider.name} games.")
+
+async def _slash_listing(interaction: discord.Interaction, command_name: str, dlc_only=False):
+    """Answer a slash command that lists every store"""
+    logger.debug("/%s invoked", command_name)
+    try:
+        await _defer(interaction, command_name)
+
+        # All stores concurrently; a slow store only drops its own section
+        results = await scan_providers()
+        if all(result.error is not None for result in results):
+            if any(result.timed_out for result in results):
+                message = "⏱️ Timed out fetching game data. Please try again."
             else:
-                await interaction.response.send_message("⚠️ Error fetching Epic Games.", ephemeral=True)
-        except Exception as send_err:
-            print("[Error sending error message]", send_err)
+                message = "⚠️ The stores aren't responding right now. Please try again in a few minutes."
+            await outbound.followup(interaction, content=message, ephemeral=True)
+            return
+
+        currency = get_user_currency(interaction)
+        embeds = build_listing_embeds(listing_sections(results, dlc_only), currency)
+        if not embeds:
+            if dlc_only:
+                description = "```ansi\n\u001b[0;33m⚠ No DLC giveaways available\u001b[0m\n```\nNo DLC/add-on giveaways currently detected."
+            else:
+                description = "```ansi\n\u001b[0;33m⚠ No free games available\u001b[0m\n```\nNo free games currently on Epic or Steam, but I'm checking every hour!"
+            await outbound.followup(interaction, embed=discord.Embed(description=description, color=0xFEE75C))
+            return
+
+        notes = freshness_notes(result.provider for result in results)
+        await send_embed_pages(_followup_sender(interaction), embeds, content=notes)
+    except Exception as e:
+        message = "⚠️ Error fetching DLC giveaways." if dlc_only else "⚠️ Error fetching games."
+        await _report_slash_error(interaction, command_name, e, message)
+
+@bot.tree.command(name="epicgames", description="Show current Epic Games free games")
+async def slash_epic(interaction: discord.Interaction):
+    """Show current Epic Games free games via slash command"""
+    await _slash_store(interaction, 'epicgames', 'epic')
 
 @bot.tree.command(name="steamgames", description="Show current Steam free games")
 async def slash_steam(interaction: discord.Interaction):
     """Show current Steam free games via slash command"""
-    print("[/steamgames invoked]")
-    try:
-        try:
-            if not interaction.response.is_done():
-                await interaction.response.defer(thinking=True)
-        except Exception as e:
-            print(f"[/steamgames defer failed] {e}")
-        try:
-            games = await asyncio.wait_for(asyncio.to_thread(get_steam_free_games), timeout=15)
-        except asyncio.TimeoutError:
-            await interaction.followup.send("⏱️ Timed out fetching Steam data. Please try again shortly.", ephemeral=True)
-            return
-        await _send_embed_list(interaction, games, 'Steam')
-    except Exception as e:
-        print(f"[/steamgames error] {e}")
-        traceback.print_exception(type(e), e, e.__traceback__)
-        try:
-            if interaction.response.is_done():
-                await interaction.followup.send("⚠️ Error fetching Steam games.", ephemeral=True)
-            else:
-                await interaction.response.send_message("⚠️ Error fetching Steam games.", ephemeral=True)
-        except Exception as send_err:
-            print("[Error sending error message]", send_err)
+    await _slash_store(interaction, 'steamgames', 'steam')
 
 @bot.tree.command(name="allgames", description="Show all free games from both Epic and Steam")
 async def slash_all_games(interaction: discord.Interaction):
     """Show all free games from both Epic and Steam via slash command"""
-    print("[/allgames invoked]")
-    try:
-        try:
-            if not interaction.response.is_done():
-                await interaction.response.defer(thinking=True)
-        except Exception as e:
-            print(f"[/allgames defer failed] {e}")
-        
-        # Fetch both platforms concurrently
-        try:
-            epic_task = asyncio.to_thread(get_epic_free_games)
-            steam_task = asyncio.to_thread(get_steam_free_games)
-            epic_games, steam_games = await asyncio.gather(
-                asyncio.wait_for(epic_task, timeout=12),
-                asyncio.wait_for(steam_task, timeout=15)
-            )
-        except asyncio.TimeoutError:
-            await interaction.followup.send("⏱️ Timed out fetching game data. Please try again.", ephemeral=True)
-            return
-        
-        # Check if any games found
-        if not epic_games and not steam_games:
-            embed = discord.Embed(
-                description="```ansi\n\u001b[0;33m⚠ No free games available\u001b[0m\n```\nNo free games currently on Epic or Steam, but I'm checking every hour!",
-                color=0xFEE75C
-            )
-            await interaction.followup.send(embed=embed)
-            return
-        
-        # Detect user currency
-        currency = get_user_currency(interaction)
-        
-        # Send Epic Games
-        if epic_games:
-            header_embed = discord.Embed(
-                description="```ansi\n\u001b[0;34m🏪 EPIC GAMES STORE\u001b[0m\n```",
-                color=0x2E3440
-            )
-            await interaction.followup.send(embed=header_embed)
-            for game in epic_games:
-                embed = create_embed(game, 'Epic Games', currency)
-                await interaction.followup.send(embed=embed)
-                await asyncio.sleep(0.3)
-        
-        # Send Steam Games
-        if steam_games:
-            header_embed = discord.Embed(
-                description="```ansi\n\u001b[0;36m⚙️ STEAM STORE\u001b[0m\n```",
-                color=0x1B2838
-            )
-            await interaction.followup.send(embed=header_embed)
-            for game in steam_games:
-                embed = create_embed(game, 'Steam', currency)
-                await interaction.followup.send(embed=embed)
-                await asyncio.sleep(0.3)
-                
-    except Exception as e:
-        print(f"[/allgames error] {e}")
-        traceback.print_exception(type(e), e, e.__traceback__)
-        try:
-            if interaction.response.is_done():
-                await interaction.followup.send("⚠️ Error fetching games.", ephemeral=True)
-            else:
-                await interaction.response.send_message("⚠️ Error fetching games.", ephemeral=True)
-        except Exception as send_err:
-            print("[Error sending error message]", send_err)
+    await _slash_listing(interaction, 'allgames')
 
 @bot.tree.command(name="dlconly", description="Show only DLC/add-on giveaways")
 async def slash_dlc_only(interaction: discord.Interaction):
     """Show only DLC/add-on giveaways from both Epic and Steam"""
-    print("[/dlconly invoked]")
-    try:
-        try:
-            if not interaction.response.is_done():
-                await interaction.response.defer(thinking=True)
-        except Exception as e:
-            print(f"[/dlconly defer failed] {e}")
-
-        try:
-            epic_task = asyncio.to_thread(get_epic_free_games)
-            steam_task = asyncio.to_thread(get_steam_free_games)
-            epic_games, steam_games = await asyncio.gather(
-                asyncio.wait_for(epic_task, timeout=12),
-                asyncio.wait_for(steam_task, timeout=15)
-            )
-        except asyncio.TimeoutError:
-            await interaction.followup.send("⏱️ Timed out fetching game data. Please try again.", ephemeral=True)
-            return
-
-        epic_dlc = filter_dlc_games(epic_games)
-        steam_dlc = filter_dlc_games(steam_games)
+    await _slash_listing(interaction, 'dlconly', dlc_only=True)
+
+PLATFORM_CHOICES = [
+    app_commands.Choice(name=' + '.join(provider.name for provider in all_providers()), value='all'),
+    *(app_commands.Choice(name=f"{provider.name} only", value=provider.key) for provider in all_providers()),
+]
+
+CURRENCY_CHOICES = [
+    app_commands.Choice(name=f"{code} - {info['name']}", value=code)
+    for code, info in CURRENCIES.items()
+]
+
+def describe_subscription(subscription):
+    """Human-readable summary of a guild subscription"""
+    if subscription.platforms is None:
+        platforms = "All stores"
+    else:
+        platform_names = {provider.key: provider.name for provider in all_providers()}
+        platforms = ', '.join(platform_names.get(key, key) for key in subscription.platforms)
+    lines = [
+        f"📢 Channel: <#{subscription.channel_id}>",
+        f"🏪 Platforms: {platforms}",
+        f"🧩 DLC only: {'Yes' if subscription.dlc_only else 'No'}",
+        f"🔔 Ping: {f'<@&{subscription.ping_role_id}>' if subscription.ping_role_id else 'None'}",
+        f"💱 Currency: {subscription.currency}",
+    ]
+    return "\n".join(lines)
+
+@bot.tree.command(name="subscribe", description="Choose where and how this server gets free game announcements")
+@app_commands.guild_only()
+@app_commands.default_permissions(manage_guild=True)
+@app_commands.describe(
+    channel="Channel to post announcements in",
+    platforms="Which stores to announce",
+    dlc_only="Only announce DLC/add-on giveaways",
+    ping_role="Role to ping with each announcement",
+    currency="Currency for displayed prices"
+)
+@app_commands.choices(platforms=PLATFORM_CHOICES, currency=CURRENCY_CHOICES)
+async def slash_subscribe(
+    interaction: discord.Interaction,
+    channel: discord.TextChannel,
+    platforms: app_commands.Choice[str] = None,
+    dlc_only: bool = False,
+    ping_role: discord.Role = None,
+    currency: app_commands.Choice[str] = None
+):
+    """Create or update this guild's announcement subscription"""
+    if not channel.permissions_for(interaction.guild.me).send_messages:
+        await interaction.response.send_message(f"⚠️ I can't send messages in {channel.mention}.", ephemeral=True)
+        return
 
-        if not epic_dlc and not steam_dlc:
-            embed = discord.Embed(
-                description="```ansi\n\u001b[0;33m⚠ No DLC giveaways available\u001b[0m\n```\nNo DLC/add-on giveaways currently detected.",
-                color=0xFEE75C
-            )
-            await interaction.followup.send(embed=embed)
-            return
+    platform_value = platforms.value if platforms else 'all'
+    subscription = Subscription(
+        interaction.guild.id,
+        channel.id,
+        None if platform_value == 'all' else (platform_value,),
+        dlc_only,
+        ping_role.id if ping_role else None,
+        currency.value if currency else get_user_currency(interaction)
+    )
+    subscriptions.save(subscription)
 
-        currency = get_user_currency(interaction)
+    embed = discord.Embed(
+        description="```ansi\n\u001b[0;32m✓ Subscription saved\u001b[0m\n```\n" + describe_subscription(subscription),
+        color=0x57F287
+    )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="unsubscribe", description="Stop free game announcements in this server")
+@app_commands.guild_only()
+@app_commands.default_permissions(manage_guild=True)
+async def slash_unsubscribe(interaction: discord.Interaction):
+    """Remove this guild's announcement subscription"""
+    legacy = legacy_subscription()
+    # Also silences the legacy config channel, which would otherwise take over again
+    had_legacy = legacy is not None and legacy.guild_id == interaction.guild.id
+    if subscriptions.remove(interaction.guild.id) or had_legacy:
+        await interaction.response.send_message("✅ Announcements stopped for this server.", ephemeral=True)
+    else:
+        await interaction.response.send_message("This server has no announcement subscription.", ephemeral=True)
+
+@bot.tree.command(name="subscription", description="Show this server's announcement settings")
+@app_commands.guild_only()
+async def slash_subscription(interaction: discord.Interaction):
+    """Show this guild's announcement subscription"""
+    subscription = subscriptions.get(interaction.guild.id)
+    if subscription is None:
+        await interaction.response.send_message("This server has no announcement subscription. An admin can set one up with `/subscribe`.", ephemeral=True)
+        return
 
-        if epic_dlc:
-            header_embed = discord.Embed(
-                description="```ansi\n\u001b[0;34m🏪 EPIC DLC GIVEAWAYS\u001b[0m\n```",
-                color=0x2E3440
-            )
-            await interaction.followup.send(embed=header_embed)
-            for game in epic_dlc:
-                embed = create_embed(game, 'Epic Games', currency)
-                await interaction.followup.send(embed=embed)
-                await asyncio.sleep(0.3)
-
-        if steam_dlc:
-            header_embed = discord.Embed(
-                description="```ansi\n\u001b[0;36m⚙️ STEAM DLC GIVEAWAYS\u001b[0m\n```",
-                color=0x1B2838
-            )
-            await interaction.followup.send(embed=header_embed)
-            for game in steam_dlc:
-                embed = create_embed(game, 'Steam', currency)
-                await interaction.followup.send(embed=embed)
-                await asyncio.sleep(0.3)
+    embed = discord.Embed(description=describe_subscription(subscription), color=0x5865F2)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
 
-    except Exception as e:
-        print(f"[/dlconly error] {e}")
-        traceback.print_exception(type(e), e, e.__traceback__)
-        try:
-            if interaction.response.is_done():
-                await interaction.followup.send("⚠️ Error fetching DLC giveaways.", ephemeral=True)
-            else:
-                await interaction.response.send_message("⚠️ Error fetching DLC giveaways.", ephemeral=True)
-        except Exception as send_err:
-            print("[Error sending error message]", send_err)
+async def main(token):
+    """Run the bot and release the shared HTTP session on shutdown"""
+    metrics_runner = None
+    try:
+        if METRICS_PORT:
+            metrics_runner = await start_metrics_server(METRICS_HOST, METRICS_PORT)
+        async with bot:
+            await bot.start(token)
+    finally:
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        launch_stager.close()
+        await outbound.close()
+        await close_session()
 
 # Run the bot
 if __name__ == "__main__":
     TOKEN = os.getenv('DISCORD_TOKEN')
     if not TOKEN:
-        print("Error: DISCORD_TOKEN not found in .env file!")
+        logger.error("Error: DISCORD_TOKEN not found in .env file!")
+        log_listener.stop()
         exit(1)
 
-    bot.run(TOKEN)
+    try:
+        asyncio.run(main(TOKEN))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        log_listener.stop()
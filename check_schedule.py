@@ -0,0 +1,47 @@
+import time
+
+FAST_INTERVAL_SECONDS = 30
+WINDOW_BEFORE_SECONDS = 60
+WINDOW_AFTER_SECONDS = 15 * 60
+
+class AdaptiveSchedule:
+    """
+    Picks the delay until the next store check from known promotion boundaries.
+
+    Boundaries are UTC epochs at which a store's offers are known to flip
+    (Epic end and start dates). From `window_before` seconds ahead of one
+    until `window_after` seconds past it, checks run every `fast_interval`
+    seconds so a new offer is picked up right away; otherwise the next check
+    is `slow_interval` away or lands just before the next boundary, whichever
+    comes first.
+    """
+
+    def __init__(self, slow_interval, fast_interval=FAST_INTERVAL_SECONDS,
+                 window_before=WINDOW_BEFORE_SECONDS, window_after=WINDOW_AFTER_SECONDS):
+        self.slow_interval = slow_interval
+        self.fast_interval = min(fast_interval, slow_interval)
+        self.window_before = window_before
+        self.window_after = window_after
+
+    def next_delay(self, boundaries, now=None):
+        """Seconds until the next check"""
+        if now is None:
+            now = time.time()
+
+        delay = self.slow_interval
+        for boundary in boundaries:
+            if boundary - self.window_before <= now <= boundary + self.window_after:
+                return self.fast_interval
+            if boundary > now:
+                delay = min(delay, boundary - self.window_before - now)
+        return max(self.fast_interval, delay)
+
+def promotion_boundaries(games):
+    """Every known end (and start) time in a snapshot"""
+    boundaries = set()
+    for game in games:
+        if game.starts_at is not None:
+            boundaries.add(game.starts_at)
+        if game.ends_at is not None:
+            boundaries.add(game.ends_at)
+    return boundaries
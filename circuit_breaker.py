@@ -0,0 +1,97 @@
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+    def __init__(self, name, retry_in):
+        super().__init__(f"{name} is unavailable, retrying in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream that keeps failing.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls
+    fail fast with CircuitOpenError. Once the backoff has passed, a single
+    half-open probe is let through: success closes the circuit, failure opens
+    it again for twice as long (up to `max_delay`), with +/-`jitter` so
+    several instances don't all retry together.
+    """
+
+    def __init__(self, name, failure_threshold=3, base_delay=15, max_delay=600, jitter=0.2):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.retry_at = 0.0
+        self._probing = False
+
+    @property
+    def is_failing(self):
+        """Whether the last call failed (or the circuit is not closed)"""
+        return self.state != CLOSED or self.failures > 0
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        now = time.monotonic()
+        if self.state == OPEN:
+            if now < self.retry_at:
+                raise CircuitOpenError(self.name, self.retry_at - now)
+            self.state = HALF_OPEN
+            self._probing = False
+        if self.state == HALF_OPEN:
+            if self._probing:
+                raise CircuitOpenError(self.name, 0)
+            self._probing = True
+
+    def record_success(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self._trip()
+
+    def _trip(self):
+        self.trips += 1
+        delay = min(self.max_delay, self.base_delay * 2 ** (self.trips - 1))
+        delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        self.state = OPEN
+        self.retry_at = time.monotonic() + delay
+        logger.warning("%s circuit opened after %d failure(s); retrying in %.0fs", self.name, self.failures, delay)
+
+    async def call(self, func, *args):
+        """Await func(*args) through the breaker"""
+        self.before_call()
+        try:
+            result = await func(*args)
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def stats(self):
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'trips': self.trips,
+            'retry_in': max(0.0, round(self.retry_at - time.monotonic(), 1)) if self.state == OPEN else 0.0,
+        }
@@ -0,0 +1,192 @@
+import asyncio
+import json
+import logging
+import pathlib
+import time
+import aiohttp
+from http_client import get_session
+
+logger = logging.getLogger(__name__)
+
+# Currencies prices can be shown in
+CURRENCIES = {
+    'USD': {'symbol': '$', 'name': 'US Dollar'},
+    'EUR': {'symbol': '€', 'name': 'Euro'},
+    'GBP': {'symbol': '£', 'name': 'British Pound'},
+    'CAD': {'symbol': 'C$', 'name': 'Canadian Dollar'},
+    'AUD': {'symbol': 'A$', 'name': 'Australian Dollar'},
+    'JPY': {'symbol': '¥', 'name': 'Japanese Yen'},
+    'INR': {'symbol': '₹', 'name': 'Indian Rupee'},
+    'BRL': {'symbol': 'R$', 'name': 'Brazilian Real'},
+    'MXN': {'symbol': 'MX$', 'name': 'Mexican Peso'},
+    'PHP': {'symbol': '₱', 'name': 'Philippine Peso'},
+}
+
+# Shown without decimals
+WHOLE_UNIT_CURRENCIES = frozenset({'JPY'})
+
+# Units per US dollar, used until a live table has been fetched or cached
+FALLBACK_RATES = {
+    'USD': 1.0, 'EUR': 0.92, 'GBP': 0.79, 'CAD': 1.36, 'AUD': 1.53,
+    'JPY': 149.50, 'INR': 83.12, 'BRL': 4.97, 'MXN': 17.08, 'PHP': 55.50,
+}
+
+DEFAULT_SOURCE_URL = "https://open.er-api.com/v6/latest/USD"
+DEFAULT_REFRESH_SECONDS = 12 * 3600
+CACHE_FILE = pathlib.Path(__file__).parent / 'currency_rates.json'
+
+def parse_rates_payload(payload):
+    """
+    Units per US dollar from an exchange-rate JSON payload.
+
+    Accepts the common {"base"/"base_code": ..., "rates": {code: rate}} shape
+    (open.er-api.com, frankfurter.app, exchangerate.host) with any base
+    currency, as long as USD is among the rates.
+    """
+    rates = payload.get('rates') if isinstance(payload, dict) else None
+    if not isinstance(rates, dict) or not rates:
+        raise ValueError("exchange-rate payload has no rates")
+    base = str(payload.get('base_code') or payload.get('base') or 'USD').upper()
+    rates = {
+        str(code).upper(): float(rate) for code, rate in rates.items()
+        if isinstance(rate, (int, float)) and rate > 0
+    }
+    rates.setdefault(base, 1.0)
+    usd = rates.get('USD')
+    if not usd:
+        raise ValueError("exchange-rate payload has no USD rate")
+    return {code: rate / usd for code, rate in rates.items()}
+
+def http_rates_source(url, timeout=10):
+    """Rates source that GETs an exchange-rate JSON document"""
+    async def fetch():
+        async with get_session().get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+    return fetch
+
+def file_rates_source(path):
+    """Rates source that reads an exchange-rate JSON file (e.g. one you maintain yourself)"""
+    path = pathlib.Path(path)
+
+    async def fetch():
+        return json.loads(await asyncio.to_thread(path.read_text, encoding='utf-8'))
+    return fetch
+
+def rates_source(location):
+    """http_rates_source for an http(s) URL, file_rates_source for anything else"""
+    if str(location).startswith(('http://', 'https://')):
+        return http_rates_source(location)
+    return file_rates_source(location)
+
+def format_amount(amount, currency):
+    """An amount in major units, with the currency's symbol (or code, if it has none here)"""
+    info = CURRENCIES.get(currency)
+    if info is None:
+        return f"{amount:.2f} {currency}"
+    if currency in WHOLE_UNIT_CURRENCIES:
+        return f"{info['symbol']}{int(amount)}"
+    return f"{info['symbol']}{amount:.2f}"
+
+class PriceTable(dict):
+    """A game's price in every display currency, for one version of the rates."""
+
+    __slots__ = ('version',)
+
+    def __init__(self, version, prices):
+        super().__init__(prices)
+        self.version = version
+
+class CurrencyRates:
+    """
+    Exchange rates (units per US dollar) from a pluggable source.
+
+    Starts from the cache file if there is one, else from FALLBACK_RATES.
+    refresh() asks `source` (an async callable returning an exchange-rate
+    JSON payload) for a new table once `refresh_interval` seconds have passed
+    and writes it to the cache. `version` goes up whenever the rates change,
+    which is how per-game price tables know to recompute.
+    """
+
+    def __init__(self, cache_path=None, source=None, refresh_interval=DEFAULT_REFRESH_SECONDS):
+        self.cache_path = pathlib.Path(cache_path) if cache_path else None
+        self.source = source
+        self.refresh_interval = refresh_interval
+        self.rates = dict(FALLBACK_RATES)
+        self.updated_at = 0.0
+        self.version = 0
+        self._load_cache()
+
+    def _load_cache(self):
+        if self.cache_path is None or not self.cache_path.exists():
+            return
+        try:
+            cached = json.loads(self.cache_path.read_text(encoding='utf-8'))
+            self.rates = parse_rates_payload(cached)
+            self.updated_at = float(cached.get('fetched_at', 0))
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable currency rate cache %s: %s", self.cache_path, e)
+
+    def _save_cache(self):
+        if self.cache_path is None:
+            return
+        data = {'base': 'USD', 'fetched_at': self.updated_at, 'rates': self.rates}
+        tmp_path = self.cache_path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(data, sort_keys=True), encoding='utf-8')
+        tmp_path.replace(self.cache_path)
+
+    def is_stale(self, now=None):
+        return (time.time() if now is None else now) - self.updated_at >= self.refresh_interval
+
+    async def refresh(self, force=False):
+        """Fetch new rates if the table is stale (or `force`); returns whether they changed"""
+        if self.source is None or not (force or self.is_stale()):
+            return False
+        rates = parse_rates_payload(await self.source())
+        changed = rates != self.rates
+        self.rates = rates
+        self.updated_at = time.time()
+        if changed:
+            self.version += 1
+        await asyncio.to_thread(self._save_cache)
+        return changed
+
+    def convert(self, amount_minor, source_currency, target_currency):
+        """Hundredths of `source_currency` in major units of the target, or None if a rate is missing"""
+        source_rate = self.rates.get(source_currency)
+        target_rate = self.rates.get(target_currency)
+        if not source_rate or not target_rate:
+            return None
+        return amount_minor / 100 / source_rate * target_rate
+
+    def format_price(self, amount_minor, source_currency, target_currency):
+        """Display price in the target currency, or in the source currency if it can't be converted"""
+        converted = self.convert(amount_minor, source_currency, target_currency)
+        if converted is None:
+            return format_amount(amount_minor / 100, source_currency)
+        return format_amount(converted, target_currency)
+
+    def price_table(self, game):
+        """The game's display price in every currency, computed once per rates version, or None"""
+        if game.price_minor is None:
+            return None
+        table = game.prices
+        if table is None or table.version != self.version:
+            table = game.prices = PriceTable(self.version, {
+                currency: self.format_price(game.price_minor, game.currency, currency)
+                for currency in CURRENCIES
+            })
+        return table
+
+    def stats(self):
+        return {
+            'currencies': len(self.rates),
+            'age_seconds': round(time.time() - self.updated_at) if self.updated_at else None,
+            'version': self.version,
+        }
+
+_rates = CurrencyRates(CACHE_FILE)
+
+def get_rates():
+    """The process-wide rates table used for rendering"""
+    return _rates
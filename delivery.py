@@ -0,0 +1,139 @@
+import asyncio
+import discord
+import logging
+
+logger = logging.getLogger(__name__)
+
+DELIVERY_CONCURRENCY = 8
+EDIT_CONCURRENCY = 4
+
+async def deliver_announcements(bot, subscriptions, platform_key, games, render_embed, is_dlc,
+                                send=None, concurrency=DELIVERY_CONCURRENCY, on_sent=None, already_sent=None):
+    """
+    Fan new games out to every subscribed channel.
+
+    Each (game, currency) embed is rendered once and shared by all channels;
+    channels are served concurrently (at most `concurrency` at a time) while
+    the messages inside one channel keep their order.
+    `send(channel, **kwargs)` defaults to channel.send. `on_sent(subscription,
+    game, message)` is called for every announcement message posted.
+    `already_sent(channel_id, game)` tells which channels got a game on an
+    earlier attempt, so a retry skips them.
+    Returns (channels, failed): the number of channels that received at least
+    one game, and the ids of games that didn't reach a channel wanting them.
+    """
+    if send is None:
+        send = lambda channel, **kwargs: channel.send(**kwargs)
+
+    rendered = {}
+
+    def embed_for(game, currency):
+        key = (game.id, currency)
+        if key not in rendered:
+            rendered[key] = render_embed(game, currency)
+        return rendered[key]
+
+    semaphore = asyncio.Semaphore(concurrency)
+    failed = set()
+
+    def wanted_by(subscription):
+        return [
+            game for game in games
+            if subscription.wants(platform_key, is_dlc(game))
+            and not (already_sent is not None and already_sent(subscription.channel_id, game))
+        ]
+
+    async def deliver(subscription):
+        channel = bot.get_channel(subscription.channel_id)
+        if channel is None:
+            logger.warning("Subscribed channel %s not found (guild %s)", subscription.channel_id, subscription.guild_id)
+            return False
+
+        wanted = wanted_by(subscription)
+        if not wanted:
+            return False
+
+        sent_any = False
+        async with semaphore:
+            for game in wanted:
+                content = subscription.ping_content(game.title)
+                if content:
+                    try:
+                        await send(channel, content=content, allowed_mentions=discord.AllowedMentions(everyone=True, roles=True))
+                    except Exception:
+                        # If pinging fails (permissions), continue without stopping announcements
+                        pass
+                try:
+                    message = await send(channel, embed=embed_for(game, subscription.currency))
+                except Exception as e:
+                    logger.error("Announcing %s in channel %s failed: %s", game.title, subscription.channel_id, e)
+                    failed.add(game.id)
+                    continue
+                sent_any = True
+                if on_sent is not None and message is not None:
+                    on_sent(subscription, game, message)
+        return sent_any
+
+    results = await asyncio.gather(*(deliver(sub) for sub in subscriptions), return_exceptions=True)
+
+    delivered = 0
+    for subscription, result in zip(subscriptions, results):
+        if isinstance(result, Exception):
+            logger.error("Delivery to channel %s failed: %s", subscription.channel_id, result)
+            failed.update(game.id for game in wanted_by(subscription))
+        elif result:
+            delivered += 1
+    return delivered, failed
+
+async def expire_announcements(bot, store, platform_key, games, render_ended, edit=None,
+                               concurrency=EDIT_CONCURRENCY):
+    """
+    Edit every posted announcement of `games` into its "ended" state.
+
+    One edit per recorded message, at most `concurrency` at a time, with each
+    (game, currency) embed rendered once. Messages are forgotten once edited,
+    or when their channel or message is gone; other failures are retried on
+    the next call. `edit(message, **kwargs)` defaults to message.edit.
+    Returns the number of messages edited.
+    """
+    if edit is None:
+        edit = lambda message, **kwargs: message.edit(**kwargs)
+
+    rendered = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def expire(game, channel_id, message_id, currency):
+        channel = bot.get_channel(channel_id)
+        if channel is None:
+            return message_id, False
+
+        key = (game.id, currency)
+        if key not in rendered:
+            rendered[key] = render_ended(game, currency)
+
+        async with semaphore:
+            try:
+                await edit(channel.get_partial_message(message_id), embed=rendered[key])
+            except (discord.NotFound, discord.Forbidden):
+                return message_id, False
+        return message_id, True
+
+    jobs = [
+        expire(game, channel_id, message_id, currency)
+        for game in games
+        for channel_id, message_id, currency in store.posted_messages(platform_key, game.id)
+    ]
+    if not jobs:
+        return 0
+
+    edited = 0
+    done = []
+    for result in await asyncio.gather(*jobs, return_exceptions=True):
+        if isinstance(result, Exception):
+            logger.error("Editing an ended announcement failed: %s", result)
+            continue
+        message_id, was_edited = result
+        done.append(message_id)
+        edited += was_edited
+    store.forget_messages(done)
+    return edited
@@ -0,0 +1,65 @@
+import re
+from functools import lru_cache
+
+# Words that mark DLC in titles, descriptions and store URLs/slugs, matched on
+# lowercased text. One alternation on word boundaries, so "dlc" in "/dlc/"
+# or "game-dlc-pack" counts but "expansionist" doesn't.
+_DLC_TEXT = re.compile(
+    r"\b(?:dlcs?|downloadable content|add-?ons?|expansions?|expansion pass"
+    r"|season pass(?:es)?|soundtracks?)\b"
+)
+# Every marker contains one of these; most text has none of them, so the
+# plain substring checks spare the regex almost every miss
+_ANCHORS = ('dlc', 'add', 'expansion', 'season pass', 'soundtrack', 'downloadable')
+
+# Epic offerType values that settle the question without looking at any text
+EPIC_DLC_OFFER_TYPES = frozenset({'ADD_ON', 'DLC'})
+EPIC_BASE_OFFER_TYPES = frozenset({'BASE_GAME', 'BUNDLE', 'EDITION'})
+
+# Steam appdetails types; soundtracks are their own 'music' type
+STEAM_DLC_APP_TYPES = frozenset({'dlc', 'music'})
+
+TEXT_CACHE_SIZE = 4096
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def has_dlc_markers(*fields):
+    """Whether any of the text fields (title, description, URL...) reads like DLC"""
+    # Newlines keep a marker from spanning two fields
+    text = '\n'.join(field for field in fields if field).lower()
+    return any(anchor in text for anchor in _ANCHORS) and _DLC_TEXT.search(text) is not None
+
+def is_epic_dlc(element, product_slug=''):
+    """
+    Whether an Epic catalog element is DLC/add-on content.
+
+    offerType and the "addons" category decide when present; only offers
+    typed OTHERS (or untyped) fall back to the title, description and slug.
+    """
+    offer_type = str(element.get('offerType') or '').upper()
+    if offer_type in EPIC_DLC_OFFER_TYPES:
+        return True
+    if offer_type in EPIC_BASE_OFFER_TYPES:
+        return False
+
+    for category in element.get('categories') or ():
+        if isinstance(category, dict):
+            path = str(category.get('path', ''))
+            if path == 'addons' or path.startswith('addons/'):
+                return True
+
+    return has_dlc_markers(element.get('title'), element.get('description'), product_slug)
+
+def is_steam_dlc(title, description, url, app_type=None):
+    """Whether a Steam entry is DLC; a known app type decides over the text"""
+    if app_type:
+        return app_type in STEAM_DLC_APP_TYPES
+    return has_dlc_markers(title, description, url)
+
+def is_dlc(game):
+    """A FreeGame's DLC flag, set once by its fetcher when the record was built"""
+    return game.is_dlc
+
+def classifier_stats():
+    """Hit/miss counters of the text marker cache"""
+    info = has_dlc_markers.cache_info()
+    return {'hits': info.hits, 'misses': info.misses, 'size': info.currsize}
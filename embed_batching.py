@@ -0,0 +1,94 @@
+import discord
+
+# Discord limits per message
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+
+# Buttons stop working with the interaction token anyway
+PAGINATOR_TIMEOUT = 14 * 60
+
+def pack_embeds(embeds, max_embeds=MAX_EMBEDS_PER_MESSAGE, max_chars=MAX_EMBED_CHARS_PER_MESSAGE):
+    """Greedily group embeds into pages that each fit in a single message."""
+    pages = []
+    page = []
+    page_chars = 0
+    for embed in embeds:
+        embed_chars = len(embed)
+        if page and (len(page) >= max_embeds or page_chars + embed_chars > max_chars):
+            pages.append(page)
+            page = []
+            page_chars = 0
+        page.append(embed)
+        page_chars += embed_chars
+    if page:
+        pages.append(page)
+    return pages
+
+class EmbedPaginator(discord.ui.View):
+    """Previous/next buttons that swap a message between pre-packed embed pages."""
+
+    def __init__(self, pages, timeout=PAGINATOR_TIMEOUT):
+        super().__init__(timeout=timeout)
+        self.pages = pages
+        self.index = 0
+        self.message = None
+        self._sync_buttons()
+
+    def _sync_buttons(self):
+        self.previous_page.disabled = self.index == 0
+        self.next_page.disabled = self.index >= len(self.pages) - 1
+        self.page_label.label = f"{self.index + 1}/{len(self.pages)}"
+
+    async def _show(self, interaction):
+        self._sync_buttons()
+        await interaction.response.edit_message(embeds=self.pages[self.index], view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.index = max(0, self.index - 1)
+        await self._show(interaction)
+
+    @discord.ui.button(label="1/1", style=discord.ButtonStyle.secondary, disabled=True)
+    async def page_label(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.defer()
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.index = min(len(self.pages) - 1, self.index + 1)
+        await self._show(interaction)
+
+    async def on_timeout(self):
+        if self.message is None:
+            return
+        for item in self.children:
+            item.disabled = True
+        try:
+            await self.message.edit(view=self)
+        except discord.HTTPException:
+            pass
+
+async def send_embed_pages(send, embeds, paginate=True, content=None):
+    """
+    Send embeds in as few messages as possible.
+
+    `send(**kwargs)` must return the sent message. With `paginate`, results
+    that need more than one message are sent once with page buttons;
+    otherwise every page is sent in turn. `content` goes with the first message.
+    """
+    pages = pack_embeds(embeds)
+    if not pages:
+        return
+
+    if len(pages) == 1 or not paginate:
+        for index, page in enumerate(pages):
+            if index == 0 and content:
+                await send(content=content, embeds=page)
+            else:
+                await send(embeds=page)
+        return
+
+    view = EmbedPaginator(pages)
+    if content:
+        view.message = await send(content=content, embeds=pages[0], view=view)
+    else:
+        view.message = await send(embeds=pages[0], view=view)
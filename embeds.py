@@ -0,0 +1,167 @@
+import discord
+import time
+from datetime import datetime
+from currency_rates import get_rates
+from dlc_classifier import is_dlc
+from metrics import EMBED_CACHE, EMBED_RENDER_SECONDS
+
+def filter_dlc_games(games):
+    """Return only DLC/add-on entries from a game list."""
+    return [game for game in games if is_dlc(game)]
+
+# Rendered embeds as dicts, keyed by (game id, content hash, provider key, currency)
+_EMBED_CACHE = {}
+EMBED_CACHE_MAX_ENTRIES = 2000
+
+def game_content_hash(game):
+    """Hash of every field that affects how a game renders"""
+    return hash(game)
+
+def create_embed(game, provider, currency='USD'):
+    """
+    Return the announcement embed for a game from `provider` (its StoreProvider,
+    which supplies the name, colour and emoji), rendering it only on a cache miss.
+
+    Only the timestamp is fresh per call. The returned embed shares its
+    fields with the cache, so callers must not modify it.
+    """
+    key = (game.id, game_content_hash(game), provider.key, currency)
+    data = _EMBED_CACHE.get(key)
+    if data is None:
+        EMBED_CACHE.labels('miss').inc()
+        if len(_EMBED_CACHE) >= EMBED_CACHE_MAX_ENTRIES:
+            _EMBED_CACHE.clear()
+        started = time.perf_counter()
+        data = _EMBED_CACHE[key] = _render_embed(game, provider, currency).to_dict()
+        EMBED_RENDER_SECONDS.observe(time.perf_counter() - started)
+    else:
+        EMBED_CACHE.labels('hit').inc()
+
+    embed = discord.Embed.from_dict(data)
+    embed.timestamp = datetime.now()
+    return embed
+
+def invalidate_embeds(provider_key=None, game_ids=None):
+    """
+    Drop cached embeds for one provider (or all of them), optionally only
+    those of `game_ids`, e.g. games a snapshot diff reported as changed or gone.
+    """
+    if provider_key is None and game_ids is None:
+        _EMBED_CACHE.clear()
+        return
+    if game_ids is not None:
+        game_ids = set(game_ids)
+    for key in [key for key in _EMBED_CACHE
+                if (provider_key is None or key[2] == provider_key) and (game_ids is None or key[0] in game_ids)]:
+        del _EMBED_CACHE[key]
+
+def create_ended_embed(game, provider, currency='USD'):
+    """The announcement embed edited into its "promotion ended" state"""
+    embed = _render_embed(game, provider, currency, ended=True)
+    embed.timestamp = game.end_datetime or datetime.now()
+    return embed
+
+def _render_embed(game, provider, currency='USD', ended=False):
+    """Create a modern rich embed for game announcement"""
+    platform = provider.name
+    color = 0x4F545C if ended else provider.color
+
+    # Create embed with modern styling
+    embed = discord.Embed(
+        title="",  # Empty title for cleaner look
+        description="",  # Will add content below
+        color=color
+    )
+
+    # Add game title as author for modern look
+    embed.set_author(
+        name=f"🎮 {game.title}",
+        icon_url=provider.icon_url
+    )
+
+    # Main description with platform badge
+    if ended:
+        status_badge = "```ansi\n\u001b[0;31m● PROMOTION ENDED\u001b[0m\n```"
+    else:
+        status_badge = "```ansi\n\u001b[0;32m● FREE NOW\u001b[0m\n```"
+    dlc_badge = "```ansi\n\u001b[0;33m● DLC / ADD-ON\u001b[0m\n```" if is_dlc(game) else ""
+
+    embed.description = f"{provider.emoji} **{platform}**\n{status_badge}{dlc_badge}"
+
+    # Add description in a modern card style
+    if game.description:
+        desc_text = game.description[:180] + "..." if len(game.description) > 180 else game.description
+        embed.add_field(
+            name="📝 About",
+            value=f">>> {desc_text}",
+            inline=False
+        )
+
+    # Price and availability in a compact row
+    info_row = []
+
+    if game.price_minor:
+        prices = get_rates().price_table(game)
+        converted_price = prices.get(currency) or get_rates().format_price(game.price_minor, game.currency, currency)
+        if ended:
+            info_row.append(f"💰 Back to **{converted_price}**")
+        else:
+            info_row.append(f"💰 ~~{converted_price}~~ **FREE**")
+
+    if ended:
+        info_row.append("⏰ This giveaway has ended")
+    elif game.ends_at is not None:
+        info_row.append(f"⏰ Until **{game.end_datetime.strftime('%B %d, %Y at %I:%M %p UTC')}**")
+    else:
+        info_row.append(f"⏰ Check the {platform} page for the end date")
+
+    if info_row:
+        embed.add_field(
+            name="💎 Deal Information",
+            value="\n".join(info_row),
+            inline=False
+        )
+
+    # Modern CTA button style
+    if ended:
+        cta = f"[View store page →]({game.url})\n*Keep an eye out for the next one!*"
+    else:
+        cta = f"### [🎁 Claim Now →]({game.url})\n*Click above to get this game for free!*"
+    embed.add_field(
+        name="",
+        value=cta,
+        inline=False
+    )
+
+    # Set thumbnail/image
+    if game.image:
+        embed.set_image(url=game.image)
+
+    # Modern footer
+    embed.set_footer(
+        text=f"{provider.emoji} Free Games Notifier • Powered by {platform}",
+        icon_url=None
+    )
+
+    return embed
+
+# Section headers for multi-store listings
+EPIC_HEADER = ("```ansi\n\u001b[0;34m🏪 EPIC GAMES STORE\u001b[0m\n```", 0x2E3440)
+STEAM_HEADER = ("```ansi\n\u001b[0;36m⚙️ STEAM STORE\u001b[0m\n```", 0x1B2838)
+EPIC_DLC_HEADER = ("```ansi\n\u001b[0;34m🏪 EPIC DLC GIVEAWAYS\u001b[0m\n```", 0x2E3440)
+STEAM_DLC_HEADER = ("```ansi\n\u001b[0;36m⚙️ STEAM DLC GIVEAWAYS\u001b[0m\n```", 0x1B2838)
+
+def build_listing_embeds(sections, currency='USD'):
+    """
+    Flatten (header, games, provider) sections into one embed list, skipping
+    empty sections. `header` is a (description, color) pair or None.
+    """
+    embeds = []
+    for header, games, provider in sections:
+        if not games:
+            continue
+        if header:
+            description, color = header
+            embeds.append(discord.Embed(description=description, color=color))
+        embeds.extend(create_embed(game, provider, currency) for game in games)
+    return embeds
@@ -1,26 +1,123 @@
-import requests
-from datetime import datetime
+import asyncio
+import aiohttp
+import hashlib
+import json
+import logging
+from dlc_classifier import is_epic_dlc
+from free_game import FreeGame, Platform, parse_iso_timestamp
+from http_client import get_session, run_sync
+from metrics import PARSE_SECONDS
+
+logger = logging.getLogger(__name__)
 
 EPIC_API_URL = "https://store-site-backend-static.ak.epicgames.com/freeGamesPromotions"
 
-def _is_epic_dlc(game, title, description, product_slug):
-    """Infer whether an Epic catalog item is DLC/add-on content."""
-    offer_type = str(game.get('offerType', '')).lower()
-    categories = game.get('categories', [])
-    category_text = " ".join(
-        str(cat.get('path', '')) + " " + str(cat.get('name', ''))
-        for cat in categories
-        if isinstance(cat, dict)
-    ).lower()
+# Validators and parse result of the last successful fetch; the payload only
+# changes about once a week, so most fetches can skip parsing entirely
+_last_fetch = {
+    'etag': None,
+    'last_modified': None,
+    'body_hash': None,
+    'games': None,
+}
 
-    text = " ".join([title, description, product_slug or '', offer_type, category_text]).lower()
-    markers = ['dlc', 'add-on', 'addon', 'expansion', 'season pass', 'soundtrack']
-    return any(marker in text for marker in markers)
+_fetch_stats = {
+    'requests': 0,
+    'not_modified': 0,
+    'unchanged_body': 0,
+    'parses': 0,
+}
 
-def get_epic_free_games():
+def get_epic_fetch_stats():
+    """Counters for conditional requests and skipped parses"""
+    return dict(_fetch_stats)
+
+def _epic_record(game, offer):
+    """FreeGame for one catalog element and one of its free promotional offers"""
+    # Extract game information
+    title = game.get('title', 'Unknown Game')
+    description = game.get('description', 'No description available')
+    
+    # Build the store URL
+    product_slug = game.get('productSlug') or game.get('catalogNs', {}).get('mappings', [{}])[0].get('pageSlug', '')
+    url = f"https://store.epicgames.com/en-US/p/{product_slug}" if product_slug else "https://store.epicgames.com"
+    
+    # Get original price (already in minor units)
+    total_price = game.get('price', {}).get('totalPrice', {})
+    original_price = total_price.get('originalPrice', 0)
+    currency = total_price.get('currencyCode') or 'USD'
+    
+    # Get image
+    images = game.get('keyImages', [])
+    image_url = None
+    for img in images:
+        if img.get('type') in ['DieselStoreFrontWide', 'OfferImageWide', 'Thumbnail']:
+            image_url = img.get('url')
+            break
+    
+    # Create unique ID
+    game_id = game.get('id', product_slug)
+    is_dlc = is_epic_dlc(game, product_slug)
+    
+    return FreeGame(
+        game_id, Platform.EPIC, title, description, url,
+        image=image_url,
+        starts_at=parse_iso_timestamp(offer.get('startDate', '')),
+        ends_at=parse_iso_timestamp(offer.get('endDate', '')),
+        price_minor=original_price or None,
+        currency=currency,
+        is_dlc=is_dlc
+    )
+
+def _parse_epic_games(data):
+    """
+    Extract free games from a freeGamesPromotions payload: those free now,
+    followed by upcoming free promotions (their starts_at is in the future)
+    """
+    free_games = []
+    upcoming_games = []
+    
+    # Parse the games data
+    games = data.get('data', {}).get('Catalog', {}).get('searchStore', {}).get('elements', [])
+    
+    for game in games:
+        # Check if game has promotional offers
+        promotions = game.get('promotions')
+        if not promotions:
+            continue
+        
+        # Current promotions: free if the discount price is 0
+        for offer_set in promotions.get('promotionalOffers') or []:
+            for offer in offer_set.get('promotionalOffers', []):
+                discount_price = game.get('price', {}).get('totalPrice', {}).get('discountPrice', -1)
+                if discount_price == 0:
+                    free_games.append(_epic_record(game, offer))
+        
+        # Upcoming promotions: the price isn't discounted yet, so go by the offer's discount
+        for offer_set in promotions.get('upcomingPromotionalOffers') or []:
+            for offer in offer_set.get('promotionalOffers', []):
+                if offer.get('discountSetting', {}).get('discountPercentage') == 0:
+                    upcoming_games.append(_epic_record(game, offer))
+    
+    free_games.extend(upcoming_games)
+    
+    # Remove duplicates based on ID
+    seen_ids = set()
+    unique_games = []
+    for game in free_games:
+        if game.id not in seen_ids:
+            seen_ids.add(game.id)
+            unique_games.append(game)
+    
+    return unique_games
+
+async def get_epic_free_games_async():
     """
     Fetch current free games from Epic Games Store
-    Returns a list of free game dictionaries
+    Returns a list of FreeGame records
+
+    Errors are logged and re-raised, so an outage isn't mistaken for an
+    empty promotion list.
     """
     try:
         params = {
@@ -28,89 +125,53 @@ def get_epic_free_games():
             'country': 'US',
             'allowCountries': 'US'
         }
-        
-        response = requests.get(EPIC_API_URL, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        free_games = []
-        
-        # Parse the games data
-        games = data.get('data', {}).get('Catalog', {}).get('searchStore', {}).get('elements', [])
-        
-        for game in games:
-            # Check if game has promotional offers
-            promotions = game.get('promotions')
-            if not promotions:
-                continue
-            
-            # Check both current and upcoming promotions
-            promotional_offers = promotions.get('promotionalOffers', [])
-            
-            for offer_set in promotional_offers:
-                for offer in offer_set.get('promotionalOffers', []):
-                    # Check if it's currently free (discount price is 0)
-                    discount_price = game.get('price', {}).get('totalPrice', {}).get('discountPrice', -1)
-                    
-                    if discount_price == 0:
-                        # Extract game information
-                        title = game.get('title', 'Unknown Game')
-                        description = game.get('description', 'No description available')
-                        
-                        # Build the store URL
-                        product_slug = game.get('productSlug') or game.get('catalogNs', {}).get('mappings', [{}])[0].get('pageSlug', '')
-                        url = f"https://store.epicgames.com/en-US/p/{product_slug}" if product_slug else "https://store.epicgames.com"
-                        
-                        # Get end date
-                        end_date_str = offer.get('endDate', '')
-                        try:
-                            end_date = datetime.fromisoformat(end_date_str.replace('Z', '+00:00'))
-                            end_date_formatted = end_date.strftime('%B %d, %Y at %I:%M %p UTC')
-                        except:
-                            end_date_formatted = 'Unknown'
-                        
-                        # Get original price
-                        original_price = game.get('price', {}).get('totalPrice', {}).get('originalPrice', 0)
-                        original_price_formatted = f"${original_price / 100:.2f}" if original_price > 0 else "Free"
-                        
-                        # Get image
-                        images = game.get('keyImages', [])
-                        image_url = None
-                        for img in images:
-                            if img.get('type') in ['DieselStoreFrontWide', 'OfferImageWide', 'Thumbnail']:
-                                image_url = img.get('url')
-                                break
-                        
-                        # Create unique ID
-                        game_id = game.get('id', product_slug)
-                        is_dlc = _is_epic_dlc(game, title, description, product_slug)
-                        
-                        free_games.append({
-                            'id': game_id,
-                            'title': title,
-                            'description': description,
-                            'url': url,
-                            'end_date': end_date_formatted,
-                            'original_price': original_price_formatted,
-                            'image': image_url,
-                            'is_dlc': is_dlc
-                        })
-        
-        # Remove duplicates based on ID
-        seen_ids = set()
-        unique_games = []
-        for game in free_games:
-            if game['id'] not in seen_ids:
-                seen_ids.add(game['id'])
-                unique_games.append(game)
-        
-        return unique_games
-    
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching Epic Games data: {e}")
-        return []
+
+        headers = {}
+        if _last_fetch['games'] is not None:
+            if _last_fetch['etag']:
+                headers['If-None-Match'] = _last_fetch['etag']
+            if _last_fetch['last_modified']:
+                headers['If-Modified-Since'] = _last_fetch['last_modified']
+
+        session = get_session()
+        async with session.get(EPIC_API_URL, params=params, headers=headers) as response:
+            _fetch_stats['requests'] += 1
+            if response.status == 304 and _last_fetch['games'] is not None:
+                _fetch_stats['not_modified'] += 1
+                return _last_fetch['games']
+
+            response.raise_for_status()
+            body = await response.read()
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+
+        # Same bytes as last time: hand back the same list without parsing;
+        # the provider then reuses its active/upcoming split of it and the
+        # check's snapshot diff short-circuits on the identical list
+        body_hash = hashlib.sha256(body).hexdigest()
+        if body_hash == _last_fetch['body_hash'] and _last_fetch['games'] is not None:
+            _fetch_stats['unchanged_body'] += 1
+            games = _last_fetch['games']
+        else:
+            with PARSE_SECONDS.labels('epic').time():
+                games = _parse_epic_games(json.loads(body))
+            _fetch_stats['parses'] += 1
+
+        _last_fetch.update(etag=etag, last_modified=last_modified, body_hash=body_hash, games=games)
+        return games
+
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.warning("Error fetching Epic Games data: %s", e)
+        raise
     except Exception as e:
-        print(f"Error parsing Epic Games data: {e}")
+        logger.exception("Error parsing Epic Games data: %s", e)
+        raise
+
+def get_epic_free_games():
+    """Blocking wrapper around get_epic_free_games_async(); returns [] on failure"""
+    try:
+        return run_sync(get_epic_free_games_async)
+    except Exception:
         return []
 
 # Test function
@@ -121,10 +182,10 @@ if __name__ == "__main__":
     if games:
         print(f"\nFound {len(games)} free game(s):\n")
         for game in games:
-            print(f"Title: {game['title']}")
-            print(f"URL: {game['url']}")
-            print(f"End Date: {game['end_date']}")
-            print(f"Original Price: {game['original_price']}")
+            print(f"Title: {game.title}")
+            print(f"URL: {game.url}")
+            print(f"End Date: {game.end_datetime}")
+            print(f"Original Price: {game.price_minor} ({game.currency} minor units)")
             print("-" * 50)
     else:
         print("No free games found or error occurred.")
@@ -0,0 +1,152 @@
+import enum
+import re
+import time
+from datetime import datetime, timezone
+
+class Platform(str, enum.Enum):
+    """Stores games come from; values double as provider and subscription keys."""
+
+    EPIC = 'epic'
+    STEAM = 'steam'
+
+class FreeGame:
+    """
+    One free game as returned by the store fetchers.
+
+    `starts_at`/`ends_at` are UTC epochs in seconds (None when the store
+    doesn't say); a game whose start is still ahead is an upcoming promotion.
+    `price_minor` is the regular price in hundredths of `currency` (None when
+    unknown). `app_id` is the store's own numeric id, where it has one.
+    Records are compared and hashed by value, so don't modify one after it has
+    been handed out. `prices` only caches the price in each display currency
+    (see currency_rates) and isn't part of the value.
+    """
+
+    _FIELDS = ('id', 'platform', 'title', 'description', 'url', 'image',
+               'starts_at', 'ends_at', 'price_minor', 'currency', 'is_dlc', 'app_id')
+    __slots__ = _FIELDS + ('prices',)
+
+    def __init__(self, id, platform, title, description, url, image=None, starts_at=None,
+                 ends_at=None, price_minor=None, currency='USD', is_dlc=False, app_id=None):
+        self.id = id
+        self.platform = Platform(platform)
+        self.title = title
+        self.description = description
+        self.url = url
+        self.image = image
+        self.starts_at = starts_at
+        self.ends_at = ends_at
+        self.price_minor = price_minor
+        self.currency = currency
+        self.is_dlc = is_dlc
+        self.app_id = app_id
+        self.prices = None
+
+    def _fields(self):
+        return tuple(getattr(self, name) for name in self._FIELDS)
+
+    def __eq__(self, other):
+        if not isinstance(other, FreeGame):
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    def __hash__(self):
+        return hash(self._fields())
+
+    def __repr__(self):
+        return f"FreeGame({self.platform.value}:{self.id!r}, {self.title!r})"
+
+    def to_dict(self):
+        """The record's fields as JSON-friendly values; FreeGame(**d) rebuilds it"""
+        return {name: getattr(self, name) for name in self._FIELDS}
+
+    def replace(self, **changes):
+        """A copy of this record with some fields changed"""
+        fields = {name: getattr(self, name) for name in self._FIELDS}
+        fields.update(changes)
+        return FreeGame(**fields)
+
+    def is_upcoming(self, now=None):
+        if self.starts_at is None:
+            return False
+        return self.starts_at > (time.time() if now is None else now)
+
+    @property
+    def end_datetime(self):
+        if self.ends_at is None:
+            return None
+        return datetime.fromtimestamp(self.ends_at, timezone.utc)
+
+class IncompleteSnapshot(list):
+    """
+    A fetch result known to be missing games, e.g. a search capped at its
+    first rows. Games absent from it may still be on offer, so they mustn't
+    be taken as ended.
+    """
+
+    __slots__ = ()
+
+def split_upcoming(games, now=None):
+    """(active, upcoming) parts of a snapshot as of `now`"""
+    if now is None:
+        now = time.time()
+    active = []
+    upcoming = []
+    for game in games:
+        (upcoming if game.is_upcoming(now) else active).append(game)
+    return active, upcoming
+
+def parse_iso_timestamp(text):
+    """UTC epoch seconds for an ISO 8601 date such as Epic's endDate, or None"""
+    if not text:
+        return None
+    try:
+        return int(datetime.fromisoformat(text.replace('Z', '+00:00')).timestamp())
+    except ValueError:
+        return None
+
+# Digits with '.'/',' separators, or spaces before a group of three ("1 299 руб.")
+_PRICE_NUMBER = re.compile(r'\d(?:[\d.,]|[ \u00a0\u202f](?=\d{3}(?!\d)))*')
+_DECIMAL_CENTS = re.compile(r'[.,]\d{2}$')
+
+def parse_price_minor(text):
+    """Hundredths of the amount in a store price label like "$19.99" or "19,99€", or None"""
+    match = _PRICE_NUMBER.search(text or '')
+    if not match:
+        return None
+    number = match.group().rstrip('.,')
+    digits = re.sub(r'\D', '', number)
+    return int(digits) if _DECIMAL_CENTS.search(number) else int(digits) * 100
+
+# Currency markers in store price labels, most specific first (Steam puts a
+# prefix on every dollar other than USD). Markers can't follow a letter, so
+# "S$" doesn't match inside "ARS$"
+_PRICE_CURRENCY_MARKERS = tuple((re.compile(r'(?<![^\W\d_])' + pattern), currency) for pattern, currency in (
+    (r'CDN\$', 'CAD'), (r'NZ\$', 'NZD'), (r'Mex\$', 'MXN'), (r'MX\$', 'MXN'), (r'HK\$', 'HKD'),
+    (r'NT\$', 'TWD'), (r'CLP\$', 'CLP'), (r'COL\$', 'COP'), (r'ARS\$', 'ARS'), (r'\$U', 'UYU'),
+    (r'A\$', 'AUD'), (r'C\$', 'CAD'), (r'R\$', 'BRL'), (r'S\$', 'SGD'), (r'S/\.', 'PEN'),
+    (r'R(?= ?\d)', 'ZAR'), (r'zł', 'PLN'), (r'руб', 'RUB'), (r'€', 'EUR'), (r'£', 'GBP'), (r'₹', 'INR'),
+    (r'₱', 'PHP'), (r'₩', 'KRW'), (r'₽', 'RUB'), (r'₴', 'UAH'), (r'₸', 'KZT'), (r'₪', 'ILS'),
+    (r'฿', 'THB'), (r'₫', 'VND'), (r'Rp', 'IDR'), (r'RM', 'MYR'), (r'TL', 'TRY'),
+))
+_ISO_CURRENCY = re.compile(r'\b[A-Z]{3}\b')
+# A plain dollar amount, which on Steam is USD
+_BARE_DOLLARS = re.compile(r'\$ ?\d[\d.,]*|\d[\d.,]* ?\$')
+
+def parse_price_currency(text):
+    """
+    ISO code of the currency in a store price label like "CDN$ 19.99", "19,99€"
+    or "$5.99 USD", or None when the label doesn't say (e.g. "199,00 kr").
+    """
+    label = (text or '').strip()
+    for marker, currency in _PRICE_CURRENCY_MARKERS:
+        if marker.search(label):
+            return currency
+    if '¥' in label:
+        # Steam shows yen without decimals and yuan with them
+        number = _PRICE_NUMBER.search(label)
+        return 'CNY' if number and _DECIMAL_CENTS.search(number.group().rstrip('.,')) else 'JPY'
+    match = _ISO_CURRENCY.search(label)
+    if match:
+        return match.group()
+    return 'USD' if _BARE_DOLLARS.fullmatch(label) else None
@@ -0,0 +1,99 @@
+import sqlite3
+
+# Stored in place of a key list for guilds that want every store, including ones added later
+ALL_PLATFORMS = '*'
+
+class Subscription:
+    """Where and how one guild wants free-game announcements delivered; `platforms` None means every store."""
+
+    __slots__ = ('guild_id', 'channel_id', 'platforms', 'dlc_only', 'ping_role_id', 'currency', 'ping_everyone')
+
+    def __init__(self, guild_id, channel_id, platforms=None, dlc_only=False,
+                 ping_role_id=None, currency='USD', ping_everyone=False):
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.platforms = tuple(platforms) if platforms is not None else None
+        self.dlc_only = dlc_only
+        self.ping_role_id = ping_role_id
+        self.currency = currency
+        self.ping_everyone = ping_everyone
+
+    def wants(self, platform_key, is_dlc):
+        """Whether a game from `platform_key` should go to this guild."""
+        if self.platforms is not None and platform_key not in self.platforms:
+            return False
+        return is_dlc or not self.dlc_only
+
+    def ping_content(self, title):
+        """Message text that goes with an announcement, or None for no ping."""
+        if self.ping_role_id:
+            return f"<@&{self.ping_role_id}> New free game available: {title}"
+        if self.ping_everyone:
+            return f"@everyone New free game available: {title}"
+        return None
+
+class SubscriptionStore:
+    """SQLite table of per-guild subscriptions, one row per guild."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS subscriptions ("
+            " guild_id INTEGER PRIMARY KEY,"
+            " channel_id INTEGER NOT NULL,"
+            " platforms TEXT NOT NULL,"
+            " dlc_only INTEGER NOT NULL DEFAULT 0,"
+            " ping_role_id INTEGER,"
+            " currency TEXT NOT NULL DEFAULT 'USD')"
+        )
+        # Guilds that ran /unsubscribe, so the legacy config channel stays quiet for them too
+        self._conn.execute("CREATE TABLE IF NOT EXISTS unsubscribed (guild_id INTEGER PRIMARY KEY)")
+        # Rows saved when Epic and Steam were the only stores meant "every store"
+        with self._conn:
+            self._conn.execute("UPDATE subscriptions SET platforms = ? WHERE platforms = 'epic,steam'", (ALL_PLATFORMS,))
+        self._subscriptions = {}
+        for guild_id, channel_id, platforms, dlc_only, ping_role_id, currency in self._conn.execute(
+            "SELECT guild_id, channel_id, platforms, dlc_only, ping_role_id, currency FROM subscriptions"
+        ):
+            self._subscriptions[guild_id] = Subscription(
+                guild_id, channel_id, None if platforms == ALL_PLATFORMS else platforms.split(','),
+                bool(dlc_only), ping_role_id, currency
+            )
+        self._unsubscribed = {guild_id for guild_id, in self._conn.execute("SELECT guild_id FROM unsubscribed")}
+
+    def get(self, guild_id):
+        return self._subscriptions.get(guild_id)
+
+    def is_unsubscribed(self, guild_id):
+        """Whether the guild opted out of announcements with /unsubscribe."""
+        return guild_id in self._unsubscribed
+
+    def all(self):
+        return list(self._subscriptions.values())
+
+    def save(self, subscription):
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO subscriptions"
+                " (guild_id, channel_id, platforms, dlc_only, ping_role_id, currency)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (subscription.guild_id, subscription.channel_id,
+                 ALL_PLATFORMS if subscription.platforms is None else ','.join(subscription.platforms),
+                 int(subscription.dlc_only), subscription.ping_role_id, subscription.currency)
+            )
+            self._conn.execute("DELETE FROM unsubscribed WHERE guild_id = ?", (subscription.guild_id,))
+        self._subscriptions[subscription.guild_id] = subscription
+        self._unsubscribed.discard(subscription.guild_id)
+
+    def remove(self, guild_id):
+        """Drop the guild's subscription and remember the opt-out; returns whether it had one."""
+        with self._conn:
+            self._conn.execute("DELETE FROM subscriptions WHERE guild_id = ?", (guild_id,))
+            self._conn.execute("INSERT OR IGNORE INTO unsubscribed (guild_id) VALUES (?)", (guild_id,))
+        self._unsubscribed.add(guild_id)
+        return self._subscriptions.pop(guild_id, None) is not None
+
+    def close(self):
+        self._conn.close()
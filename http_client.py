@@ -0,0 +1,44 @@
+import asyncio
+import aiohttp
+
+# Connection pool shared by every store fetcher
+MAX_CONNECTIONS = 20
+MAX_CONNECTIONS_PER_HOST = 4
+DNS_CACHE_TTL = 300
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=10)
+
+_session = None
+
+def get_session():
+    """Return the shared keep-alive aiohttp session, creating it on first use."""
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=MAX_CONNECTIONS,
+            limit_per_host=MAX_CONNECTIONS_PER_HOST,
+            ttl_dns_cache=DNS_CACHE_TTL,
+        )
+        _session = aiohttp.ClientSession(connector=connector, timeout=DEFAULT_TIMEOUT)
+    return _session
+
+async def close_session():
+    """Close the shared session (call on shutdown)."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+def run_sync(coro_func, *args):
+    """
+    Run an async fetcher from synchronous code.
+
+    The session is tied to the event loop it was created on, so it is closed
+    before asyncio.run() tears that loop down.
+    """
+    async def runner():
+        try:
+            return await coro_func(*args)
+        finally:
+            await close_session()
+
+    return asyncio.run(runner())
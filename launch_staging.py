@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import time
+import aiohttp
+from datetime import datetime
+from http_client import get_session
+
+logger = logging.getLogger(__name__)
+
+IMAGE_CHECK_TIMEOUT = aiohttp.ClientTimeout(total=5)
+
+async def validate_image(url):
+    """
+    Whether an image URL still serves an image.
+
+    Only a definite answer (an error status or a non-image content type)
+    counts as broken; network trouble gives the image the benefit of the doubt.
+    """
+    if not url:
+        return False
+    try:
+        async with get_session().head(url, allow_redirects=True, timeout=IMAGE_CHECK_TIMEOUT) as response:
+            if response.status == 405:
+                # HEAD not supported, so we can't tell
+                return True
+            if response.status >= 400:
+                return False
+            content_type = response.headers.get('Content-Type', '')
+            return not content_type or content_type.startswith('image/')
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        return True
+
+class StagedLaunch:
+    """An upcoming game ready to announce: checked record, rendered embeds and start timer."""
+
+    __slots__ = ('provider', 'source', 'game', 'embeds', 'timer')
+
+    def __init__(self, provider, source, game, embeds):
+        self.provider = provider
+        self.source = source
+        self.game = game
+        self.embeds = embeds
+        self.timer = None
+
+class LaunchStager:
+    """
+    Announcements for upcoming promotions, prepared ahead of their start.
+
+    For every new upcoming game, sync() validates the image (dropping a broken
+    one), renders an embed per subscribed currency and sets a timer for the
+    start time. When it fires, `announce(provider, games, render_embed)` gets
+    the staged record and embeds, so nothing is fetched or rendered at launch.
+    `render_embed(game, provider, currency)` builds the embeds.
+    """
+
+    def __init__(self, announce, render_embed):
+        self._announce = announce
+        self._render_embed = render_embed
+        # (provider key, game id) -> StagedLaunch
+        self._staged = {}
+
+    def staged_games(self, provider_key=None):
+        """Games waiting for their start time, of one provider or all of them"""
+        return [staged.game for key, staged in self._staged.items() if provider_key is None or key[0] == provider_key]
+
+    async def sync(self, provider, upcoming, currencies):
+        """Stage new upcoming games of one provider and drop ones that vanished or changed"""
+        upcoming = {(provider.key, game.id): game for game in upcoming}
+
+        for key, staged in list(self._staged.items()):
+            if key[0] == provider.key and upcoming.get(key) != staged.source:
+                staged.timer.cancel()
+                del self._staged[key]
+
+        new_games = [game for key, game in upcoming.items() if key not in self._staged]
+        if new_games:
+            images_ok = await asyncio.gather(*(validate_image(game.image) for game in new_games))
+            for game, image_ok in zip(new_games, images_ok):
+                self._stage(provider, game, image_ok, currencies)
+
+        # Currencies of guilds that subscribed since a game was staged
+        for key, staged in self._staged.items():
+            if key[0] == provider.key:
+                for currency in currencies:
+                    if currency not in staged.embeds:
+                        staged.embeds[currency] = self._render_embed(staged.game, provider, currency)
+
+    def _stage(self, provider, source, image_ok, currencies):
+        game = source if image_ok or not source.image else source.replace(image=None)
+        if not image_ok and source.image:
+            logger.warning("Upcoming %s game %s: image unavailable, staging without it", provider.name, game.title)
+
+        embeds = {currency: self._render_embed(game, provider, currency) for currency in currencies}
+        staged = StagedLaunch(provider, source, game, embeds)
+        key = (provider.key, game.id)
+        staged.timer = asyncio.create_task(self._fire_at(key, staged, game.starts_at))
+        self._staged[key] = staged
+        logger.info("Staged upcoming %s game: %s (starts %s)", provider.name, game.title, datetime.fromtimestamp(game.starts_at))
+
+    async def _fire_at(self, key, staged, starts_at):
+        await asyncio.sleep(max(0.0, starts_at - time.time()))
+        if self._staged.get(key) is staged:
+            del self._staged[key]
+
+        now = datetime.now()
+        for embed in staged.embeds.values():
+            embed.timestamp = now
+
+        def render(game, currency):
+            embed = staged.embeds.get(currency)
+            if embed is None:
+                embed = self._render_embed(game, staged.provider, currency)
+            return embed
+
+        try:
+            await self._announce(staged.provider, [staged.game], render)
+        except Exception as e:
+            logger.exception("Launch announcement of %s failed: %s", staged.game.title, e)
+
+    def close(self):
+        for staged in self._staged.values():
+            staged.timer.cancel()
+        self._staged.clear()
@@ -0,0 +1,71 @@
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+# Attributes every LogRecord has; anything else was passed with extra={...}
+_STANDARD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+TEXT_FORMAT = '%(asctime)s %(levelname)-8s %(name)s: %(message)s'
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and any `extra` fields."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+JsonFormatter.converter = time.gmtime
+
+def setup_logging(path, level='INFO', json_format=False, rotation='size',
+                  max_bytes=5 * 1024 * 1024, backup_count=5):
+    """
+    Route all logging through a queue to a rotating log file.
+
+    Callers only pay for putting the record on a queue; formatting and disk
+    writes happen on the QueueListener's thread, off the event loop.
+    `rotation` is 'size' (at `max_bytes`) or 'midnight' (daily).
+    Returns the listener, which must be stopped on shutdown to flush it.
+    """
+    if rotation == 'midnight':
+        file_handler = logging.handlers.TimedRotatingFileHandler(
+            path, when='midnight', backupCount=backup_count, encoding='utf-8', utc=True
+        )
+    else:
+        file_handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+        )
+    handlers = [file_handler]
+    # No console under pythonw.exe, where sys.stderr is None
+    if sys.stderr is not None and sys.stderr.isatty():
+        handlers.append(logging.StreamHandler())
+
+    formatter = JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+
+    root = logging.getLogger()
+    root.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+    def log_uncaught(exc_type, exc, tb):
+        logging.getLogger('bot').critical("Uncaught exception", exc_info=(exc_type, exc, tb))
+    sys.excepthook = log_uncaught
+
+    return listener
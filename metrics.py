@@ -0,0 +1,228 @@
+# Minimal Prometheus-style metrics: counters, gauges and histograms with labels,
+# rendered in the text exposition format on a local /metrics endpoint.
+# Recording is a dict lookup and a locked add, cheap enough for hot paths
+# (Steam parsing runs in worker threads, hence the locks).
+import bisect
+import logging
+import threading
+import time
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_REGISTRY = []
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        _REGISTRY.append(self)
+
+    def labels(self, *values):
+        """The child metric for one combination of label values"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _default(self):
+        return self.labels()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+        for values, child in list(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+class _Value:
+    __slots__ = ('value', 'lock')
+
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value):
+        self.value = value
+
+class Counter(_Metric):
+    """A value that only goes up, e.g. errors or messages sent."""
+
+    type = 'counter'
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+    def _render_child(self, values, child):
+        return [f'{self.name}_total{_format_labels(self.labelnames, values)} {_format_value(child.value)}']
+
+class Gauge(_Metric):
+    """A value that goes up and down, e.g. queue depth."""
+
+    type = 'gauge'
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value):
+        self._default().set(value)
+
+    def _render_child(self, values, child):
+        return [f'{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}']
+
+class _Timer:
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+        return False
+
+class _HistogramChild:
+    __slots__ = ('bounds', 'counts', 'sum', 'lock')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def time(self):
+        """Context manager observing the seconds spent in its block"""
+        return _Timer(self)
+
+class Histogram(_Metric):
+    """Latency distribution in cumulative buckets (seconds)."""
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def _render_child(self, values, child):
+        with child.lock:
+            counts = list(child.counts)
+            total = child.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, values, [('le', _format_value(float(bound)))])
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+        lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+class CallbackGauge(_Metric):
+    """Gauge (or counter) read at scrape time: `collect()` returns {label values tuple: value}."""
+
+    def __init__(self, name, help, labelnames, collect, type='gauge'):
+        super().__init__(name, help, labelnames)
+        self.type = type
+        self._collect = collect
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}']
+        suffix = '_total' if self.type == 'counter' else ''
+        try:
+            samples = self._collect()
+        except Exception as e:
+            logger.warning("Collecting %s failed: %s", self.name, e)
+            return lines
+        for values, value in samples.items():
+            lines.append(f'{self.name}{suffix}{_format_labels(self.labelnames, values)} {_format_value(value)}')
+        return lines
+
+def render_metrics():
+    """Every registered metric in the Prometheus text format"""
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+async def _handle_metrics(request):
+    return web.Response(text=render_metrics(), content_type='text/plain', charset='utf-8')
+
+async def start_metrics_server(host='127.0.0.1', port=9108):
+    """Serve /metrics with aiohttp; returns the runner to clean up on shutdown"""
+    app = web.Application()
+    app.router.add_get('/metrics', _handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info("Serving metrics on http://%s:%d/metrics", host, port)
+    return runner
+
+# Metrics recorded across the bot
+FETCH_SECONDS = Histogram('freegames_fetch_seconds', 'Store fetch latency', ['provider'])
+FETCH_FAILURES = Counter('freegames_fetch_failures', 'Failed store fetches', ['provider', 'reason'])
+SNAPSHOT_READS = Counter('freegames_snapshot_reads', 'Snapshot reads by commands and scans', ['provider', 'state'])
+PARSE_SECONDS = Histogram('freegames_parse_seconds', 'Store payload parse time', ['provider'])
+APP_TYPE_LOOKUP_SECONDS = Histogram('freegames_steam_app_type_lookup_seconds', 'Steam appdetails lookup latency per scan')
+EMBED_CACHE = Counter('freegames_embed_cache', 'Announcement embed cache lookups', ['result'])
+EMBED_RENDER_SECONDS = Histogram(
+    'freegames_embed_render_seconds', 'Embed render time on a cache miss',
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05)
+)
+CHECK_SECONDS = Histogram('freegames_check_seconds', 'Duration of a scheduled store check')
+COMMAND_SECONDS = Histogram('freegames_command_seconds', 'Command latency from invocation to completion', ['kind', 'command'])
+COMMAND_ERRORS = Counter('freegames_command_errors', 'Commands that failed', ['command'])
+OUTBOUND_QUEUE_SECONDS = Histogram('freegames_outbound_queue_seconds', 'Time a message waited in the outbound queue')
+OUTBOUND_SEND_SECONDS = Histogram('freegames_outbound_send_seconds', 'Discord API time per outbound message')
+ANNOUNCEMENTS = Counter('freegames_announcements', 'Games announced', ['provider'])
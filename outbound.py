@@ -0,0 +1,220 @@
+import asyncio
+import itertools
+import re
+import time
+from collections import deque
+
+import aiohttp
+import discord
+
+from metrics import OUTBOUND_QUEUE_SECONDS, OUTBOUND_SEND_SECONDS
+
+PRIORITY_INTERACTION = 0
+PRIORITY_ANNOUNCEMENT = 1
+
+# Interaction tokens stop accepting followups 15 minutes after the command
+INTERACTION_TOKEN_LIFETIME = 15 * 60
+
+_CHANNEL_ROUTE = re.compile(r'/channels/(\d+)/messages')
+_WEBHOOK_ROUTE = re.compile(r'/webhooks/\d+/([^/?]+)')
+
+class _Bucket:
+    """Last known rate-limit state of one Discord route bucket."""
+
+    __slots__ = ('lock', 'remaining', 'reset_at')
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.remaining = None
+        self.reset_at = 0.0
+
+    def delay(self):
+        if self.remaining == 0:
+            return max(0.0, self.reset_at - time.monotonic())
+        return 0.0
+
+class _Job:
+    __slots__ = ('bucket_key', 'send', 'future', 'enqueued_at', 'deadline')
+
+    def __init__(self, bucket_key, send, future, deadline):
+        self.bucket_key = bucket_key
+        self.send = send
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.deadline = deadline
+
+class OutboundScheduler:
+    """
+    Central queue for every message the bot sends.
+
+    Jobs are ordered by priority (interaction followups before background
+    announcements) and sent by a small worker pool. Sends to the same channel
+    or interaction are serialised and held back only while Discord's
+    rate-limit headers say that bucket is exhausted, instead of sleeping a
+    fixed amount between messages. Only initial interaction responses
+    (defer/send_message) bypass it, since they must land within 3 seconds
+    and have no bucket to share.
+    """
+
+    def __init__(self, workers=8, latency_window=500):
+        self.workers = workers
+        self._queue = None
+        self._buckets = {}
+        self._sequence = itertools.count()
+        self._worker_tasks = []
+
+        self.sent = 0
+        self.failed = 0
+        self.expired = 0
+        self.rate_limited = 0
+        self._queue_latencies = deque(maxlen=latency_window)
+        self._send_latencies = deque(maxlen=latency_window)
+
+    def trace_config(self):
+        """aiohttp trace hooks that feed response rate-limit headers back into the buckets."""
+        trace = aiohttp.TraceConfig()
+        trace.on_request_end.append(self._on_request_end)
+        return trace
+
+    async def _on_request_end(self, session, context, params):
+        bucket_key = self._bucket_key_for_url(params.url.path)
+        if bucket_key is None:
+            return
+
+        headers = params.response.headers
+        bucket = self._bucket(bucket_key)
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset_after = headers.get('X-RateLimit-Reset-After') or headers.get('Retry-After')
+        if params.response.status == 429:
+            self.rate_limited += 1
+            remaining = 0
+        try:
+            if remaining is not None:
+                bucket.remaining = int(remaining)
+            if reset_after is not None:
+                bucket.reset_at = time.monotonic() + float(reset_after)
+        except ValueError:
+            pass
+
+    @staticmethod
+    def _bucket_key_for_url(path):
+        match = _CHANNEL_ROUTE.search(path)
+        if match:
+            return ('channel', int(match.group(1)))
+        match = _WEBHOOK_ROUTE.search(path)
+        if match:
+            return ('webhook', match.group(1))
+        return None
+
+    def _bucket(self, bucket_key):
+        bucket = self._buckets.get(bucket_key)
+        if bucket is None:
+            bucket = self._buckets[bucket_key] = _Bucket()
+        return bucket
+
+    def _ensure_workers(self):
+        if self._queue is None:
+            self._queue = asyncio.PriorityQueue()
+        if not self._worker_tasks:
+            self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def submit(self, bucket_key, send, priority=PRIORITY_ANNOUNCEMENT, deadline=None):
+        """Queue `send` (a zero-argument coroutine function) and wait for its result."""
+        self._ensure_workers()
+        future = asyncio.get_running_loop().create_future()
+        job = _Job(bucket_key, send, future, deadline)
+        await self._queue.put((priority, next(self._sequence), job))
+        return await future
+
+    async def channel_send(self, channel, priority=PRIORITY_ANNOUNCEMENT, **kwargs):
+        """Send a message to a channel (or anything with .send) through the queue."""
+        return await self.submit(('channel', channel.id), lambda: channel.send(**kwargs), priority)
+
+    async def message_edit(self, message, priority=PRIORITY_ANNOUNCEMENT, **kwargs):
+        """Edit a (partial) message through its channel's queue."""
+        return await self.submit(('channel', message.channel.id), lambda: message.edit(**kwargs), priority)
+
+    async def followup(self, interaction, **kwargs):
+        """Send an interaction followup ahead of background traffic."""
+        deadline = time.monotonic() + INTERACTION_TOKEN_LIFETIME - (discord.utils.utcnow() - interaction.created_at).total_seconds()
+        return await self.submit(
+            ('webhook', interaction.token),
+            lambda: interaction.followup.send(**kwargs),
+            PRIORITY_INTERACTION,
+            deadline
+        )
+
+    async def _worker(self):
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job):
+        if job.future.done():
+            return
+
+        bucket = self._bucket(job.bucket_key)
+        async with bucket.lock:
+            delay = bucket.delay()
+            if delay:
+                await asyncio.sleep(delay)
+
+            started = time.monotonic()
+            self._queue_latencies.append(started - job.enqueued_at)
+            OUTBOUND_QUEUE_SECONDS.observe(started - job.enqueued_at)
+            if job.future.done():
+                return
+            if job.deadline is not None and started >= job.deadline:
+                self.expired += 1
+                job.future.set_exception(TimeoutError("interaction token expired before the followup was sent"))
+                return
+
+            try:
+                result = await job.send()
+            except Exception as e:
+                self.failed += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+                return
+            finally:
+                self._send_latencies.append(time.monotonic() - started)
+                OUTBOUND_SEND_SECONDS.observe(time.monotonic() - started)
+
+            self.sent += 1
+            if not job.future.done():
+                job.future.set_result(result)
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self):
+        """Queue depth, counters and latency percentiles (seconds)."""
+        def percentiles(samples):
+            if not samples:
+                return {'p50': 0.0, 'p95': 0.0}
+            ordered = sorted(samples)
+            return {
+                'p50': ordered[len(ordered) // 2],
+                'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+            }
+
+        return {
+            'queue_depth': self.queue_depth,
+            'sent': self.sent,
+            'failed': self.failed,
+            'expired': self.expired,
+            'rate_limited': self.rate_limited,
+            'buckets': len(self._buckets),
+            'queue_latency': percentiles(self._queue_latencies),
+            'send_latency': percentiles(self._send_latencies),
+        }
+
+    async def close(self):
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
@@ -0,0 +1,157 @@
+import asyncio
+import time
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from free_game import IncompleteSnapshot, split_upcoming
+from metrics import FETCH_SECONDS, FETCH_FAILURES, SNAPSHOT_READS
+from snapshot_cache import SnapshotCache
+
+class StoreProvider:
+    """
+    A store the bot announces free games from.
+
+    `key` namespaces game ids in the announcement history and subscriptions,
+    `name`, `color`, `emoji` and `icon_url` are how embeds show the store. Each provider owns the
+    snapshot cache in front of its fetcher and two deadlines: `timeout` for
+    user commands and `scan_timeout` for the scheduled check. Snapshots may
+    include upcoming promotions; get() and refresh() return only the games
+    that are free now; the split is reused while the snapshot list is the
+    same object, so an unchanged snapshot hands back the very same active list
+    and diff_snapshots() short-circuits on it. Fetches go through a circuit breaker, so while the
+    store is down commands get the last snapshot right away instead of
+    waiting on requests that are bound to fail.
+    """
+
+    def __init__(self, key, name, fetch, color, header, dlc_header,
+                 ttl_seconds, timeout=12, scan_timeout=20, emoji='🎮', icon_url=None):
+        self.key = key
+        self.name = name
+        self.color = color
+        self.emoji = emoji
+        self.icon_url = icon_url
+        self.header = header
+        self.dlc_header = dlc_header
+        self.timeout = timeout
+        self.scan_timeout = scan_timeout
+        self.breaker = CircuitBreaker(name)
+        self._fetch = fetch
+        self.snapshot = SnapshotCache(name, self._guarded_fetch, ttl_seconds)
+        # (snapshot, next upcoming start, active, upcoming) of the last split
+        self._split = None
+
+    async def _guarded_fetch(self):
+        started = time.perf_counter()
+        try:
+            return await self.breaker.call(self._fetch)
+        except CircuitOpenError:
+            FETCH_FAILURES.labels(self.key, 'circuit_open').inc()
+            raise
+        except asyncio.TimeoutError:
+            FETCH_FAILURES.labels(self.key, 'timeout').inc()
+            raise
+        except Exception:
+            FETCH_FAILURES.labels(self.key, 'error').inc()
+            raise
+        finally:
+            FETCH_SECONDS.labels(self.key).observe(time.perf_counter() - started)
+
+    def split(self, games):
+        """split_upcoming() of a snapshot, reused until the snapshot changes or an upcoming game starts"""
+        now = time.time()
+        cached = self._split
+        if cached is not None and cached[0] is games and now < cached[1]:
+            return cached[2], cached[3]
+        active, upcoming = split_upcoming(games, now)
+        next_start = min((game.starts_at for game in upcoming), default=float('inf'))
+        self._split = (games, next_start, active, upcoming)
+        return active, upcoming
+
+    def _count_read(self):
+        snapshot = self.snapshot
+        if not snapshot.has_snapshot:
+            state = 'cold'
+        elif snapshot.is_fresh():
+            state = 'fresh'
+        else:
+            state = 'stale'
+        SNAPSHOT_READS.labels(self.key, state).inc()
+
+    async def get(self):
+        """Current games, answered from the snapshot cache when possible."""
+        self._count_read()
+        active, _ = self.split(await self.snapshot.get(timeout=self.timeout))
+        return active
+
+    async def refresh(self):
+        """Force a fresh fetch within the scheduled-check deadline; raises if it fails."""
+        active, _ = self.split(await self.snapshot.refresh(timeout=self.scan_timeout))
+        return active
+
+    def freshness_note(self):
+        """A "data as of" note while the store is failing and commands get an old snapshot, else None"""
+        if not self.breaker.is_failing or self.snapshot.updated_at is None:
+            return None
+        return f"⚠️ {self.name} isn't responding right now; showing data as of <t:{int(self.snapshot.updated_at)}:f>."
+
+class ScanResult:
+    """
+    Outcome of scanning one provider; `error` is None on success. `complete`
+    is False when the fetch is known to have missed games (IncompleteSnapshot).
+    """
+
+    __slots__ = ('provider', 'games', 'upcoming', 'error', 'duration', 'complete')
+
+    def __init__(self, provider, games, error=None, upcoming=(), duration=0.0, complete=True):
+        self.provider = provider
+        self.games = games
+        self.upcoming = list(upcoming)
+        self.error = error
+        self.duration = duration
+        self.complete = complete
+
+    @property
+    def timed_out(self):
+        return isinstance(self.error, asyncio.TimeoutError)
+
+_PROVIDERS = {}
+
+def register_provider(provider):
+    """Add a provider to the registry (scans keep registration order)."""
+    if provider.key in _PROVIDERS:
+        raise ValueError(f"Provider {provider.key!r} is already registered")
+    _PROVIDERS[provider.key] = provider
+    return provider
+
+def get_provider(key):
+    return _PROVIDERS[key]
+
+def all_providers():
+    return list(_PROVIDERS.values())
+
+async def scan_providers(providers=None, refresh=False):
+    """
+    Fetch every provider concurrently, each bounded by its own deadline.
+
+    Wall-clock time is that of the slowest provider rather than the sum, and
+    one provider failing or timing out doesn't affect the others' results.
+    With `refresh` a failed fetch is reported in `error` even when an older
+    snapshot exists; without it commands get the stale snapshot instead.
+    """
+    if providers is None:
+        providers = all_providers()
+
+    async def scan(provider):
+        snapshot = provider.snapshot
+        started = time.perf_counter()
+        try:
+            if refresh:
+                games = await snapshot.refresh(timeout=provider.scan_timeout)
+            else:
+                provider._count_read()
+                games = await snapshot.get(timeout=provider.timeout)
+        except Exception as e:
+            return ScanResult(provider, [], e, duration=time.perf_counter() - started)
+        active, upcoming = provider.split(games)
+        return ScanResult(provider, active, upcoming=upcoming, duration=time.perf_counter() - started,
+                          complete=not isinstance(games, IncompleteSnapshot))
+
+    return await asyncio.gather(*(scan(provider) for provider in providers))
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotCache:
+    """
+    Process-wide cache of the last good result of a store fetcher.
+
+    Concurrent callers share one in-flight fetch, and once a snapshot exists
+    get() returns it immediately while a stale one is refreshed in the
+    background, even if that refresh fails. refresh() raises fetch errors, so
+    scheduled checks see outages.
+    A fetch equal to the current snapshot keeps the current list object, so
+    callers can tell "unchanged" by identity.
+    """
+
+    def __init__(self, name, fetch, ttl_seconds):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self._fetch = fetch
+        self._snapshot = None
+        self._fetched_at = None
+        self._inflight = None
+        # Wall-clock time of the current snapshot, for "data as of" notes
+        self.updated_at = None
+
+    @property
+    def has_snapshot(self):
+        return self._snapshot is not None
+
+    @property
+    def age(self):
+        """Seconds since the current snapshot was fetched, or None if empty."""
+        if self._fetched_at is None:
+            return None
+        return time.monotonic() - self._fetched_at
+
+    def is_fresh(self):
+        age = self.age
+        return age is not None and age < self.ttl_seconds
+
+    async def get(self, timeout=None):
+        """
+        Return the current snapshot.
+
+        A stale snapshot is returned as-is and refreshed in the background;
+        only a cold cache makes the caller wait for the fetch.
+        """
+        if self._snapshot is not None:
+            if not self.is_fresh():
+                self._start_refresh()
+            return self._snapshot
+
+        return await self._wait(self._start_refresh(), timeout)
+
+    async def refresh(self, timeout=None):
+        """Fetch a new snapshot now (joining any fetch already in flight); raises if the fetch fails."""
+        return await self._wait(self._start_refresh(), timeout)
+
+    def _start_refresh(self):
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.create_task(self._run_fetch())
+            # Background refreshes nobody awaits mustn't warn about an unretrieved exception
+            self._inflight.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return self._inflight
+
+    async def _run_fetch(self):
+        try:
+            snapshot = await self._fetch()
+        except Exception as e:
+            logger.warning("%s snapshot refresh failed: %s", self.name, e)
+            raise
+
+        # Fetchers return the very same list when the upstream payload didn't
+        # change; an equal but re-parsed list is swapped for the current one
+        # (unless only one of them is an IncompleteSnapshot)
+        if snapshot is not self._snapshot and (snapshot != self._snapshot or type(snapshot) is not type(self._snapshot)):
+            self._snapshot = snapshot
+        self._fetched_at = time.monotonic()
+        self.updated_at = time.time()
+        return self._snapshot
+
+    @staticmethod
+    async def _wait(task, timeout):
+        # Shield the shared task so one caller timing out doesn't cancel
+        # the fetch for everyone else waiting on it.
+        if timeout is None:
+            return await asyncio.shield(task)
+        return await asyncio.wait_for(asyncio.shield(task), timeout=timeout)
@@ -0,0 +1,84 @@
+ADDED = 'added'
+REMOVED = 'removed'
+CHANGED = 'changed'
+
+class SnapshotEvent:
+    """One difference between two snapshots; `previous` is set for changed games."""
+
+    __slots__ = ('kind', 'game', 'previous')
+
+    def __init__(self, kind, game, previous=None):
+        self.kind = kind
+        self.game = game
+        self.previous = previous
+
+    def __repr__(self):
+        return f"SnapshotEvent({self.kind}, {self.game!r})"
+
+class SnapshotDiff:
+    """Games added, removed and changed between two snapshots of one store."""
+
+    __slots__ = ('added', 'removed', 'changed')
+
+    def __init__(self, added=(), removed=(), changed=()):
+        self.added = list(added)
+        self.removed = list(removed)
+        self.changed = list(changed)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    @property
+    def events(self):
+        """All differences as SnapshotEvents, added first"""
+        return ([SnapshotEvent(ADDED, game) for game in self.added]
+                + [SnapshotEvent(CHANGED, current, previous) for previous, current in self.changed]
+                + [SnapshotEvent(REMOVED, game) for game in self.removed])
+
+    def __repr__(self):
+        return f"SnapshotDiff(+{len(self.added)} -{len(self.removed)} ~{len(self.changed)})"
+
+def diff_snapshots(previous, current):
+    """
+    Compare two lists of games by id and content hash in a single pass over each.
+
+    `changed` holds (previous, current) pairs for games whose id stayed but
+    whose content (end date, price, ...) did not.
+    """
+    if previous is current:
+        return SnapshotDiff()
+
+    previous_by_id = {game.id: (hash(game), game) for game in previous or ()}
+    added = []
+    changed = []
+    for game in current:
+        entry = previous_by_id.pop(game.id, None)
+        if entry is None:
+            added.append(game)
+        elif entry[0] != hash(game):
+            changed.append((entry[1], game))
+    removed = [game for _, game in previous_by_id.values()]
+    return SnapshotDiff(added, removed, changed)
+
+class SnapshotTracker:
+    """The last snapshot seen per store, so each check only handles what changed."""
+
+    def __init__(self):
+        self._snapshots = {}
+
+    def update(self, key, snapshot):
+        """Diff `snapshot` against the last one for `key` and remember it"""
+        diff = diff_snapshots(self._snapshots.get(key), snapshot)
+        self._snapshots[key] = snapshot
+        return diff
+
+    def last(self, key):
+        """The last snapshot diffed for `key`, or None"""
+        return self._snapshots.get(key)
+
+    def reset(self, key=None):
+        """Forget the last snapshot (of one store or all), so everything counts as added"""
+        if key is None:
+            self._snapshots.clear()
+        else:
+            self._snapshots.pop(key, None)
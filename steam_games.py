@@ -1,9 +1,21 @@
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import aiohttp
+import logging
+import threading
+from bs4 import BeautifulSoup, SoupStrainer
+from html.parser import HTMLParser
 import re
-from datetime import datetime
+import pathlib
+from dlc_classifier import is_steam_dlc
+from free_game import FreeGame, IncompleteSnapshot, Platform, parse_price_minor, parse_price_currency
+from http_client import get_session, run_sync
+from app_type_cache import AppTypeCache
+from metrics import PARSE_SECONDS, APP_TYPE_LOOKUP_SECONDS
 
-_APP_TYPE_CACHE = {}
+logger = logging.getLogger(__name__)
+
+APP_TYPE_CACHE_FILE = pathlib.Path(__file__).parent / 'app_type_cache.db'
+_APP_TYPE_CACHE = AppTypeCache(APP_TYPE_CACHE_FILE)
 
 def _normalize_app_id(raw_app_id):
     """Extract a single numeric app id from Steam's data-ds-appid formats."""
@@ -22,138 +34,377 @@ def _normalize_app_id(raw_app_id):
     match = re.search(r'\d+', first)
     return match.group() if match else None
 
-def _get_steam_app_type(app_id):
-    """Return Steam app type (`game`, `dlc`, etc.) using appdetails API."""
-    if not app_id:
-        return ''
+# lxml builds trees several times faster than html.parser; use it when installed
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
 
-    if app_id in _APP_TYPE_CACHE:
-        return _APP_TYPE_CACHE[app_id]
+# Only result rows are materialized; the rest of the search page is skipped
+# (a regex, because the strainer sees the whole multi-valued class attribute)
+_RESULT_ROWS = SoupStrainer('a', class_=re.compile(r'\bsearch_result_row\b'))
 
-    try:
-        url = "https://store.steampowered.com/api/appdetails"
-        response = requests.get(url, params={'appids': app_id, 'l': 'en'}, timeout=8)
+def _parse_result_rows(content, parser=None):
+    """Return the a.search_result_row elements of a Steam search page"""
+    with PARSE_SECONDS.labels('steam').time():
+        soup = BeautifulSoup(content, parser or HTML_PARSER, parse_only=_RESULT_ROWS)
+    return soup.find_all('a', class_='search_result_row')
+
+class _TagStripper(HTMLParser):
+    """Reusable HTML-to-text converter for review tooltips"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._parts = []
+
+    def handle_data(self, data):
+        self._parts.append(data)
+
+    def strip(self, html):
+        self.reset()
+        self._parts = []
+        self.feed(html)
+        self.close()
+        return ''.join(self._parts)
+
+# Rows are parsed in worker threads, so keep one stripper per thread
+_stripper_local = threading.local()
+
+def _strip_tags(text):
+    """Remove HTML tags from a tooltip string"""
+    if '<' not in text:
+        return text
+    stripper = getattr(_stripper_local, 'stripper', None)
+    if stripper is None:
+        stripper = _stripper_local.stripper = _TagStripper()
+    return stripper.strip(text)
+
+STEAM_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Accept-Language': 'en-US,en;q=0.9',
+    'Cookie': 'birthtime=0; mature_content=1'  # To avoid age gate
+}
+
+async def _fetch_steam_html(url):
+    """GET a Steam store page through the shared session and return its body"""
+    session = get_session()
+    async with session.get(url, headers=STEAM_HEADERS) as response:
+        response.raise_for_status()
+        return await response.read()
+
+APP_DETAILS_URL = "https://store.steampowered.com/api/appdetails"
+APP_DETAILS_BATCH_SIZE = 10
+APP_DETAILS_CONCURRENCY = 4
+
+async def _fetch_app_details(app_ids):
+    """Fetch basic appdetails for several appids in one request; returns {app_id: type}."""
+    session = get_session()
+    params = {'appids': ','.join(app_ids), 'filters': 'basic', 'l': 'en'}
+    async with session.get(APP_DETAILS_URL, params=params, timeout=aiohttp.ClientTimeout(total=8)) as response:
         response.raise_for_status()
-        data = response.json()
+        data = await response.json(content_type=None)
+
+    if not isinstance(data, dict):
+        raise ValueError("unexpected appdetails payload")
 
-        details = data.get(str(app_id), {})
+    app_types = {}
+    for app_id in app_ids:
+        details = data.get(app_id) or {}
         if details.get('success'):
-            app_type = str(details.get('data', {}).get('type', '')).lower()
-            _APP_TYPE_CACHE[app_id] = app_type
-            return app_type
-    except Exception:
-        pass
+            app_types[app_id] = str(details.get('data', {}).get('type', '')).lower()
+        else:
+            app_types[app_id] = ''
+    return app_types
+
+async def _get_steam_app_types_async(app_ids):
+    """
+    Resolve Steam app types for a whole scan at once.
+
+    Uncached appids are looked up in batches with bounded concurrency. A batch
+    Steam rejects is retried one appid at a time; appids that still fail are
+    left out of the result so callers fall back to keyword markers.
+    """
+    app_types = {}
+    missing = []
+    for app_id in dict.fromkeys(a for a in app_ids if a):
+        app_type = _APP_TYPE_CACHE.get(app_id)
+        if app_type is None:
+            missing.append(app_id)
+        else:
+            app_types[app_id] = app_type
+
+    if not missing:
+        return app_types
 
-    _APP_TYPE_CACHE[app_id] = ''
-    return ''
+    semaphore = asyncio.Semaphore(APP_DETAILS_CONCURRENCY)
 
-def _is_steam_dlc(title, description, game_url, app_id=None):
-    """Infer whether a Steam entry is DLC/add-on content."""
-    if _get_steam_app_type(app_id) == 'dlc':
-        return True
+    async def lookup(chunk):
+        async with semaphore:
+            try:
+                return await _fetch_app_details(chunk)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+                if len(chunk) == 1:
+                    return {}
+        results = await asyncio.gather(*(lookup([app_id]) for app_id in chunk))
+        return {k: v for result in results for k, v in result.items()}
+
+    chunks = [missing[i:i + APP_DETAILS_BATCH_SIZE] for i in range(0, len(missing), APP_DETAILS_BATCH_SIZE)]
+    for resolved in await asyncio.gather(*(lookup(chunk) for chunk in chunks)):
+        app_types.update(resolved)
+    _APP_TYPE_CACHE.set_many({app_id: app_types[app_id] for app_id in missing if app_id in app_types})
+
+    return app_types
+
+async def _get_steam_app_type_async(app_id):
+    """Return Steam app type (`game`, `dlc`, etc.) using appdetails API."""
+    if not app_id:
+        return ''
+    app_types = await _get_steam_app_types_async([app_id])
+    return app_types.get(app_id, '')
+
+def get_app_type_cache_stats():
+    """Hit/miss counters of the persistent app-type cache"""
+    return _APP_TYPE_CACHE.stats()
 
-    text = f"{title} {description} {game_url}".lower()
-    markers = [' dlc', '/dlc/', 'add-on', 'addon', 'expansion', 'season pass', 'soundtrack']
-    return any(marker in text for marker in markers)
+def _get_steam_app_type(app_id):
+    """Blocking wrapper around _get_steam_app_type_async()"""
+    return run_sync(_get_steam_app_type_async, app_id)
 
-def get_steam_free_games():
+def _parse_free_game_rows(content, limit=10):
     """
-    Fetch temporarily free games from Steam
-    Returns a list of free game dictionaries
+    Extract 100%-off rows from a Steam search page (DLC is classified separately).
+
+    When `limit` cuts rows off, the result is an IncompleteSnapshot.
     """
     free_games = []
+    rows = _parse_result_rows(content)
     
-    # Method 1: Check Steam's search for games that are 100% off
-    try:
-        search_url = "https://store.steampowered.com/search/?maxprice=free&specials=1"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Cookie': 'birthtime=0; mature_content=1'  # To avoid age gate
-        }
-        
-        response = requests.get(search_url, headers=headers, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Find game entries
-        game_entries = soup.find_all('a', class_='search_result_row')
-        
-        for entry in game_entries[:10]:  # Limit to first 10 results
-            try:
-                # Get game title
-                title_elem = entry.find('span', class_='title')
-                if not title_elem:
-                    continue
-                title = title_elem.text.strip()
+    for entry in rows[:limit]:
+        try:
+            # Get game title
+            title_elem = entry.find('span', class_='title')
+            if not title_elem:
+                continue
+            title = title_elem.text.strip()
+            
+            # Get game URL and ID
+            game_url = entry.get('href', '').split('?')[0]  # Remove query params
+            app_id = _normalize_app_id(entry.get('data-ds-appid', ''))
+            
+            # Check if it's actually free (was paid, now free)
+            price_elem = entry.find('div', class_='discount_final_price')
+            discount_elem = entry.find('div', class_='discount_pct')
+            
+            if not price_elem:
+                continue
+            
+            price_text = price_elem.text.strip()
+            discount_pct = discount_elem.text.strip() if discount_elem else ''
+            
+            # Look for "Free" or games with 100% discount
+            is_free = 'Free' in price_text or price_text == ''
+            is_full_discount = '-100%' in discount_pct
+            
+            if is_free or is_full_discount:
+                # Get original price
+                original_price_elem = entry.find('div', class_='discount_original_price')
+                original_price = original_price_elem.text.strip() if original_price_elem else 'Paid Game'
                 
-                # Get game URL and ID
-                game_url = entry.get('href', '').split('?')[0]  # Remove query params
-                app_id = _normalize_app_id(entry.get('data-ds-appid', ''))
+                # Get game image
+                img_elem = entry.find('img')
+                image_url = img_elem.get('src', '') if img_elem else None
+                
+                # Try to extract description from review snippet
+                review_elem = entry.find('span', class_='search_review_summary')
+                description = review_elem.get('data-tooltip-html', 'Limited time free promotion!') if review_elem else 'Limited time free promotion!'
                 
-                # Check if it's actually free (was paid, now free)
-                price_elem = entry.find('div', class_='discount_final_price')
-                discount_elem = entry.find('div', class_='discount_pct')
+                # Clean up description (remove HTML)
+                description = _strip_tags(description)
+                description = description[:200] + "..." if len(description) > 200 else description
                 
-                if not price_elem:
+                # Only add games that appear to be temporarily free (have original price)
+                if original_price and original_price != 'Paid Game':
+                    # Normally USD (see STORE_REGION); a price in a currency we
+                    # can't tell is left out rather than converted as dollars
+                    currency = parse_price_currency(original_price)
+                    if currency is None:
+                        logger.debug("Unknown currency in Steam price %r", original_price)
+                    # Steam's search rows don't say when the promotion ends
+                    free_games.append(FreeGame(
+                        f"steam_{app_id}", Platform.STEAM, title, description, game_url,
+                        image=image_url,
+                        price_minor=parse_price_minor(original_price) if currency else None,
+                        currency=currency or 'USD',
+                        app_id=app_id
+                    ))
+        except Exception as e:
+            logger.warning("Error parsing Steam game entry: %s", e)
+            continue
+    
+    if limit is not None and len(rows) > limit:
+        return IncompleteSnapshot(free_games)
+    return free_games
+
+def _parse_weekend_rows(content):
+    """Extract Free Weekend rows from a Steam search page"""
+    free_weekend_games = []
+    
+    # Look for "Free Weekend" tags
+    for entry in _parse_result_rows(content):
+        try:
+            # Check if it mentions "Free Weekend"
+            text_content = entry.get_text()
+            if 'Free Weekend' in text_content or 'Play for Free' in text_content:
+                title_elem = entry.find('span', class_='title')
+                if not title_elem:
                     continue
                 
-                price_text = price_elem.text.strip()
-                discount_pct = discount_elem.text.strip() if discount_elem else ''
+                title = title_elem.text.strip()
+                game_url = entry.get('href', '').split('?')[0]
+                app_id = _normalize_app_id(entry.get('data-ds-appid', ''))
                 
-                # Look for "Free" or games with 100% discount
-                is_free = 'Free' in price_text or price_text == ''
-                is_full_discount = '-100%' in discount_pct
+                img_elem = entry.find('img')
+                image_url = img_elem.get('src', '') if img_elem else None
                 
-                if is_free or is_full_discount:
-                    # Get original price
-                    original_price_elem = entry.find('div', class_='discount_original_price')
-                    original_price = original_price_elem.text.strip() if original_price_elem else 'Paid Game'
-                    
-                    # Get game image
-                    img_elem = entry.find('img')
-                    image_url = img_elem.get('src', '') if img_elem else None
-                    
-                    # Get release date info (approximate end date)
-                    released_elem = entry.find('div', class_='search_released')
-                    released_text = released_elem.text.strip() if released_elem else ''
-                    
-                    # Try to extract description from review snippet
-                    review_elem = entry.find('span', class_='search_review_summary')
-                    description = review_elem.get('data-tooltip-html', 'Limited time free promotion!') if review_elem else 'Limited time free promotion!'
-                    
-                    # Clean up description (remove HTML)
-                    description = BeautifulSoup(description, 'html.parser').get_text() if '<' in description else description
-                    description = description[:200] + "..." if len(description) > 200 else description
-                    
-                    # Only add games that appear to be temporarily free (have original price)
-                    if original_price and original_price != 'Paid Game':
-                        is_dlc = _is_steam_dlc(title, description, game_url, app_id)
-                        free_games.append({
-                            'id': f"steam_{app_id}",
-                            'title': title,
-                            'description': description,
-                            'url': game_url,
-                            'end_date': 'Check Steam page for end date',
-                            'original_price': original_price,
-                            'image': image_url,
-                            'is_dlc': is_dlc
-                        })
-            except Exception as e:
-                print(f"Error parsing Steam game entry: {e}")
-                continue
+                free_weekend_games.append(FreeGame(
+                    f"steam_weekend_{app_id}", Platform.STEAM, f"{title} (Free Weekend)",
+                    'Play for free this weekend! Check Steam for exact end time.',
+                    game_url,
+                    image=image_url,
+                    app_id=app_id
+                ))
+        except Exception as e:
+            logger.warning("Error parsing Free Weekend game: %s", e)
+            continue
+    
+    return free_weekend_games
+
+# Steam prices search results in the currency of the region it places the
+# request in; pinning the region keeps original prices in US dollars
+STORE_REGION = 'us'
+SEARCH_PAGE_URL = f"https://store.steampowered.com/search/?maxprice=free&specials=1&cc={STORE_REGION}"
+SEARCH_RESULTS_URL = "https://store.steampowered.com/search/results/"
+SEARCH_PAGE_SIZE = 50
+SEARCH_MAX_PAGES = 4
+SEARCH_CONCURRENCY = 2
+
+async def _fetch_search_results(start, count=SEARCH_PAGE_SIZE):
+    """Fetch one page of Steam's infinite-scroll search JSON; returns (rows_html, total_count)"""
+    params = {
+        'query': '',
+        'start': start,
+        'count': count,
+        'maxprice': 'free',
+        'specials': 1,
+        'infinite': 1,
+        'cc': STORE_REGION,
+    }
+    session = get_session()
+    async with session.get(SEARCH_RESULTS_URL, params=params, headers=STEAM_HEADERS) as response:
+        response.raise_for_status()
+        data = await response.json(content_type=None)
+
+    if not isinstance(data, dict) or not data.get('success'):
+        raise ValueError("Steam search JSON request was not successful")
+    return data.get('results_html', ''), int(data.get('total_count', 0))
+
+async def _search_free_rows_json(max_pages=SEARCH_MAX_PAGES, first_page=None):
+    """
+    Page through every 100%-off search result via the JSON endpoint.
+
+    `first_page` is the (rows_html, total_count) of page 0 if the caller has
+    fetched it already. Pages after the first are fetched a few at a time and
+    paging stops at the first page that has no free rows left. Rows are
+    de-duplicated by appid. A page that fails fails the whole search, since a
+    partial result would look like the missing games had ended.
+    """
+    rows_html, total_count = first_page or await _fetch_search_results(0)
+    pages = [await asyncio.to_thread(_parse_free_game_rows, rows_html, None)]
+    page_count = min(max_pages, -(-total_count // SEARCH_PAGE_SIZE))
+
+    next_page = 1
+    while pages[-1] and next_page < page_count:
+        wave = range(next_page, min(page_count, next_page + SEARCH_CONCURRENCY))
+        results = await asyncio.gather(*(_fetch_search_results(page * SEARCH_PAGE_SIZE) for page in wave))
+        for rows_html, _ in results:
+            page_rows = await asyncio.to_thread(_parse_free_game_rows, rows_html, None)
+            pages.append(page_rows)
+            if not page_rows:
+                break
+        next_page = wave.stop
+
+    # Still finding free rows when max_pages ran out: there are more than we fetched
+    capped = bool(pages[-1]) and page_count * SEARCH_PAGE_SIZE < total_count
+    free_games = IncompleteSnapshot() if capped else []
+    seen_ids = set()
+    for page_rows in pages:
+        for game in page_rows:
+            if game.id not in seen_ids:
+                seen_ids.add(game.id)
+                free_games.append(game)
+    return free_games
+
+async def get_steam_free_games_async(mode='json', max_pages=SEARCH_MAX_PAGES):
+    """
+    Fetch temporarily free games from Steam
+    Returns a list of FreeGame records
+
+    `mode='json'` pages through the search results endpoint (up to
+    `max_pages` pages); `mode='html'` scrapes the first 10 rows of the
+    search page and is also the fallback when the JSON endpoint's first
+    page fails. Once paging has started, a failed page fails the scan.
+    Errors are logged and re-raised, so an outage isn't mistaken for an
+    empty result.
+    """
+    free_games = []
+    
+    # Method 1: Check Steam's search for games that are 100% off
+    try:
+        free_games = None
+        if mode == 'json':
+            try:
+                first_page = await _fetch_search_results(0)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                logger.warning("Steam search JSON failed, falling back to HTML: %r", e)
+            else:
+                free_games = await _search_free_rows_json(max_pages, first_page)
+        
+        if free_games is None:
+            content = await _fetch_steam_html(SEARCH_PAGE_URL)
+            free_games = await asyncio.to_thread(_parse_free_game_rows, content)
+        
+        # Classify DLC for the whole scan with one batched appdetails lookup
+        try:
+            with APP_TYPE_LOOKUP_SECONDS.time():
+                app_types = await _get_steam_app_types_async([game.app_id for game in free_games])
+        except Exception as e:
+            logger.warning("Error resolving Steam app types: %s", e)
+            app_types = {}
+        for game in free_games:
+            app_type = app_types.get(game.app_id)
+            game.is_dlc = is_steam_dlc(game.title, game.description, game.url, app_type)
     
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching Steam data: {e}")
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.warning("Error fetching Steam data: %s", e)
+        raise
     except Exception as e:
-        print(f"Error parsing Steam data: {e}")
+        logger.exception("Error parsing Steam data: %s", e)
+        raise
     
     # Method 2: Check SteamDB's weekend deals (optional fallback)
     # Note: This is a simplified approach. For production, you might want to use SteamDB RSS or API if available
     
     return free_games
 
-def get_steam_weekend_free():
+def get_steam_free_games(mode='json', max_pages=SEARCH_MAX_PAGES):
+    """Blocking wrapper around get_steam_free_games_async(); returns [] on failure"""
+    try:
+        return run_sync(get_steam_free_games_async, mode, max_pages)
+    except Exception:
+        return []
+
+async def get_steam_weekend_free_async():
     """
     Check for Steam's Free Weekend games
     These are separate from the 100% off promotions
@@ -163,54 +414,19 @@ def get_steam_weekend_free():
     try:
         # Steam's free weekend page
         url = "https://store.steampowered.com/search/?category1=998&category2=21"  # Free to Play filter
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Cookie': 'birthtime=0; mature_content=1'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Look for "Free Weekend" tags
-        game_entries = soup.find_all('a', class_='search_result_row')
         
-        for entry in game_entries:
-            try:
-                # Check if it mentions "Free Weekend"
-                text_content = entry.get_text()
-                if 'Free Weekend' in text_content or 'Play for Free' in text_content:
-                    title_elem = entry.find('span', class_='title')
-                    if not title_elem:
-                        continue
-                    
-                    title = title_elem.text.strip()
-                    game_url = entry.get('href', '').split('?')[0]
-                    app_id = _normalize_app_id(entry.get('data-ds-appid', ''))
-                    
-                    img_elem = entry.find('img')
-                    image_url = img_elem.get('src', '') if img_elem else None
-                    
-                    free_weekend_games.append({
-                        'id': f"steam_weekend_{app_id}",
-                        'title': f"{title} (Free Weekend)",
-                        'description': 'Play for free this weekend! Check Steam for exact end time.',
-                        'url': game_url,
-                        'end_date': 'Check Steam page',
-                        'original_price': 'Full Game Access',
-                        'image': image_url,
-                        'is_dlc': False
-                    })
-            except Exception as e:
-                print(f"Error parsing Free Weekend game: {e}")
-                continue
+        content = await _fetch_steam_html(url)
+        free_weekend_games = await asyncio.to_thread(_parse_weekend_rows, content)
     
     except Exception as e:
-        print(f"Error fetching Free Weekend games: {e}")
+        logger.warning("Error fetching Free Weekend games: %s", e)
     
     return free_weekend_games
 
+def get_steam_weekend_free():
+    """Blocking wrapper around get_steam_weekend_free_async()"""
+    return run_sync(get_steam_weekend_free_async)
+
 # Test function
 if __name__ == "__main__":
     print("Testing Steam scraper...")
@@ -220,9 +436,9 @@ if __name__ == "__main__":
     if games:
         print(f"\nFound {len(games)} temporarily free game(s):\n")
         for game in games:
-            print(f"Title: {game['title']}")
-            print(f"URL: {game['url']}")
-            print(f"Original Price: {game['original_price']}")
+            print(f"Title: {game.title}")
+            print(f"URL: {game.url}")
+            print(f"Original Price: {game.price_minor} ({game.currency} minor units)")
             print("-" * 50)
     else:
         print("No temporarily free games found.")
@@ -233,8 +449,8 @@ if __name__ == "__main__":
     if weekend_games:
         print(f"\nFound {len(weekend_games)} free weekend game(s):\n")
         for game in weekend_games:
-            print(f"Title: {game['title']}")
-            print(f"URL: {game['url']}")
+            print(f"Title: {game.title}")
+            print(f"URL: {game.url}")
             print("-" * 50)
     else:
         print("No free weekend games found.")